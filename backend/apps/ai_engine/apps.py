@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+class AiEngineConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.ai_engine'
+
+    def ready(self):
+        # Load and validate every prompt template once at startup
+        from .prompt_registry import get_prompt_registry
+        get_prompt_registry()
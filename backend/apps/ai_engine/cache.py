@@ -0,0 +1,113 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """
+    Content-addressed cache for LLM completions.
+    Tier 1 is an in-process LRU, tier 2 an optional Redis store shared by all workers.
+    """
+    def __init__(self, max_entries=512, ttl=86400, redis_url=None, key_prefix='llm-cache:'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'redis_hits': 0, 'misses': 0, 'evictions': 0}
+        self._redis = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+
+    @staticmethod
+    def make_key(model, prompt, options=None):
+        """Hash the model, rendered prompt and generation options into a cache key"""
+        raw = json.dumps(
+            {'model': model, 'prompt': prompt, 'options': options or {}},
+            sort_keys=True
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+
+        value = self._redis_get(key)
+        if value is not None:
+            self._set_local(key, value)
+            with self._lock:
+                self._stats['redis_hits'] += 1
+            return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self._redis is not None:
+            try:
+                self._redis.set(self.key_prefix + key, value.encode('utf-8'), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache Redis write failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _redis_get(self, key):
+        if self._redis is None:
+            return None
+        try:
+            value = self._redis.get(self.key_prefix + key)
+        except Exception as e:
+            logger.warning(f"LLM cache Redis read failed: {str(e)}")
+            return None
+        return value.decode('utf-8') if value is not None else None
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Return the per-process response cache, or None when caching is disabled"""
+    global _response_cache
+    if not getattr(settings, 'LLM_CACHE_ENABLED', True):
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                redis_url = settings.CELERY_BROKER_URL if getattr(settings, 'LLM_CACHE_REDIS', False) else None
+                _response_cache = LLMResponseCache(
+                    max_entries=getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 512),
+                    ttl=getattr(settings, 'LLM_CACHE_TTL', 86400),
+                    redis_url=redis_url
+                )
+    return _response_cache
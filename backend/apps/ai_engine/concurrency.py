@@ -0,0 +1,99 @@
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class LLMCapacityError(Exception):
+    """Raised when no generation slot frees up within the queue timeout"""
+
+# Atomically drop expired holders and take a slot if one is free
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+class RedisSemaphore:
+    """
+    Fleet-wide counting semaphore stored as a Redis sorted set of holders.
+    Each holder is scored by its expiry so slots held by a crashed worker are reclaimed.
+    """
+    def __init__(self, redis_url, limit, key='llm-inflight', slot_ttl=120):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.limit = limit
+        self.key = key
+        self.slot_ttl = slot_ttl
+        self._acquire = self.redis.register_script(_ACQUIRE_SCRIPT)
+
+    def acquire(self, timeout):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while True:
+            now = time.time()
+            if self._acquire(keys=[self.key], args=[now, now + self.slot_ttl, self.limit, token, self.slot_ttl * 2]):
+                return token
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(delay, max(0, deadline - time.monotonic())))
+            delay = min(delay * 2, 1.0)
+
+    def renew(self, token):
+        """Push a held slot's expiry out by slot_ttl so long generations keep it"""
+        try:
+            self.redis.zadd(self.key, {token: time.time() + self.slot_ttl}, xx=True)
+            self.redis.expire(self.key, self.slot_ttl * 2)
+        except Exception as e:
+            logger.warning(f"Could not renew global LLM slot: {str(e)}")
+
+    def release(self, token):
+        try:
+            self.redis.zrem(self.key, token)
+        except Exception as e:
+            logger.warning(f"Could not release global LLM slot: {str(e)}")
+
+class GenerationGovernor:
+    """Caps concurrent in-flight generations per process and, optionally, across the fleet"""
+    def __init__(self, local_limit, wait_timeout, global_semaphore=None):
+        self.wait_timeout = wait_timeout
+        self._local = threading.BoundedSemaphore(local_limit)
+        self._global = global_semaphore
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a generation slot for the duration of the block. Yields a renew() callable
+        that long-running (streamed) generations call as they progress, so the global
+        slot doesn't expire while still in use; it only hits Redis every slot_ttl / 3.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        if not self._local.acquire(timeout=self.wait_timeout):
+            raise LLMCapacityError(f"No local LLM slot free after {self.wait_timeout}s")
+        token = None
+        try:
+            if self._global is not None:
+                token = self._global.acquire(max(0, deadline - time.monotonic()))
+                if token is None:
+                    raise LLMCapacityError(f"No global LLM slot free after {self.wait_timeout}s")
+            renewed_at = time.monotonic()
+
+            def renew():
+                nonlocal renewed_at
+                if token is None or time.monotonic() - renewed_at < self._global.slot_ttl / 3:
+                    return
+                self._global.renew(token)
+                renewed_at = time.monotonic()
+
+            yield renew
+        finally:
+            if token is not None:
+                self._global.release(token)
+            self._local.release()
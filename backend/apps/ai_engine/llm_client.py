@@ -1,29 +1,176 @@
 import requests
 import json
+import time
+import logging
+import threading
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 import environ
+from .cache import get_response_cache
+from .concurrency import GenerationGovernor, RedisSemaphore
+from .router import BackendRouter, parse_backends
 
 env = environ.Env()
+logger = logging.getLogger(__name__)
+
+_session = None
+_governor = None
+_router = None
+_shared_lock = threading.Lock()
+
+def get_session():
+    """Per-process HTTP session so Ollama connections are pooled and kept alive"""
+    global _session
+    if _session is None:
+        with _shared_lock:
+            if _session is None:
+                pool_size = int(env('OLLAMA_POOL_SIZE', default=10))
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def get_governor():
+    """Per-process limiter on in-flight generations, optionally shared through Redis"""
+    global _governor
+    if _governor is None:
+        with _shared_lock:
+            if _governor is None:
+                global_limit = int(env('OLLAMA_GLOBAL_MAX_INFLIGHT', default=0))
+                global_semaphore = None
+                if global_limit > 0:
+                    global_semaphore = RedisSemaphore(
+                        settings.CELERY_BROKER_URL,
+                        global_limit,
+                        slot_ttl=int(env('OLLAMA_TIMEOUT', default=60)) * 2
+                    )
+                _governor = GenerationGovernor(
+                    local_limit=int(env('OLLAMA_MAX_INFLIGHT', default=4)),
+                    wait_timeout=int(env('OLLAMA_QUEUE_TIMEOUT', default=120)),
+                    global_semaphore=global_semaphore
+                )
+    return _governor
+
+def get_router():
+    """Per-process router over the configured Ollama backends"""
+    global _router
+    if _router is None:
+        session = get_session()
+        with _shared_lock:
+            if _router is None:
+                backends = parse_backends(
+                    env('OLLAMA_BACKENDS', default=''),
+                    env('OLLAMA_BASE_URL', default='http://localhost:11434'),
+                    env('OLLAMA_MODEL', default='llama3')
+                )
+                _router = BackendRouter(
+                    backends,
+                    session,
+                    probe_interval=int(env('OLLAMA_PROBE_INTERVAL', default=30))
+                )
+    return _router
 
 class OllamaClient:
-    def __init__(self):
-        self.base_url = env('OLLAMA_BASE_URL', default='http://localhost:11434').rstrip('/')
-        self.model = env('OLLAMA_MODEL', default='llama3')
+    def __init__(self, use_cache=True):
         self.timeout = int(env('OLLAMA_TIMEOUT', default=60))
+        # use_cache=False skips cache reads (e.g. "regenerate") but still stores the fresh answer
+        self.use_cache = use_cache
+        self.cache = get_response_cache()
+        self.session = get_session()
+        self.governor = get_governor()
+        self.router = get_router()
+
+    def generate(self, prompt, format=None, on_token=None):
+        """
+        Return the full completion for prompt.
+        When on_token is given, Ollama's NDJSON stream is consumed and on_token(delta)
+        is called for every chunk as it arrives.
+        """
+        options = {"format": format} if format else {}
+        tried = []
+        while True:
+            backend = self.router.acquire(exclude=tried)
+            if backend is None:
+                raise Exception(f"Ollama connection failed: no backend reachable ({len(tried)} tried)")
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(backend.model, prompt, options)
+                if self.use_cache:
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        self.router.release(backend)
+                        if on_token:
+                            on_token(cached)
+                        return cached
 
-    def generate(self, prompt):
-        url = f"{self.base_url}/api/generate"
+            try:
+                response_text, latency = self._request(backend, prompt, format, on_token)
+            except requests.exceptions.Timeout:
+                self.router.release(backend, failed=True)
+                raise Exception(f"Ollama request timed out after {self.timeout}s")
+            except requests.exceptions.ConnectionError as e:
+                # Nothing was generated yet, so fail over to the next backend
+                self.router.release(backend, failed=True)
+                logger.warning(f"Ollama backend {backend.base_url} unreachable: {str(e)}")
+                tried.append(backend)
+                continue
+            except requests.exceptions.RequestException as e:
+                self.router.release(backend)
+                raise Exception(f"Ollama connection failed: {str(e)}")
+            except Exception:
+                self.router.release(backend)
+                raise
+
+            self.router.release(backend, latency=latency)
+            if cache_key is not None and response_text:
+                self.cache.set(cache_key, response_text)
+            return response_text
+
+    def _request(self, backend, prompt, format=None, on_token=None):
+        url = f"{backend.base_url}/api/generate"
         payload = {
-            "model": self.model,
+            "model": backend.model,
             "prompt": prompt,
-            "stream": False
+            "stream": on_token is not None
         }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=self.timeout)
-            response.raise_for_status()
-            return response.json().get('response', '')
-        except requests.exceptions.Timeout:
-            raise Exception(f"Ollama request timed out after {self.timeout}s")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Ollama connection failed: {str(e)}")
+        if format:
+            # Ask Ollama to constrain the completion, e.g. format='json'
+            payload["format"] = format
+
+        # Waits for a free slot; raises LLMCapacityError instead of piling onto the model server
+        with self.governor.slot() as renew_slot:
+            # Latency is measured from here so time spent queueing doesn't count against the backend
+            started = time.monotonic()
+            if on_token is None:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json().get('response', ''), time.monotonic() - started
+
+            with self.session.post(url, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                return self._consume_stream(response, on_token, renew_slot), time.monotonic() - started
+
+    def _consume_stream(self, response, on_token, renew_slot=None):
+        """
+        Read Ollama's NDJSON stream, forwarding each token and returning the full text.
+        The timeout only bounds each read, so the slot is renewed as chunks arrive.
+        """
+        parts = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise Exception(f"Ollama stream failed: {chunk['error']}")
+            if renew_slot is not None:
+                renew_slot()
+            delta = chunk.get('response', '')
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+            if chunk.get('done'):
+                break
+        return ''.join(parts)
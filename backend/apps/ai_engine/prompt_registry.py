@@ -0,0 +1,137 @@
+import os
+import logging
+import threading
+from string import Formatter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# Templates that are not platform rewrites, with the placeholders they must use
+SHARED_TEMPLATE_PLACEHOLDERS = {
+    'base': {'content', 'goal'},
+    'combined': {'content', 'goal', 'platforms'},
+}
+# Every other <platform>.txt rewrites the base caption
+PLATFORM_TEMPLATE_PLACEHOLDERS = {'base_content'}
+
+class PromptTemplate:
+    def __init__(self, name, text, mtime):
+        self.name = name
+        self.text = text
+        self.mtime = mtime
+        self.placeholders = {
+            field for _, field, _, _ in Formatter().parse(text) if field is not None
+        }
+
+    def render(self, **kwargs):
+        return self.text.format(**kwargs)
+
+class PromptRegistry:
+    """
+    Loads every prompts/*.txt once per process and serves templates from memory.
+    A file is only re-read when its mtime changes.
+    """
+    def __init__(self, prompts_path):
+        self.prompts_path = prompts_path
+        self._templates = {}
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load and validate all templates, raising ImproperlyConfigured on a bad one"""
+        with self._lock:
+            self._templates = {}
+            self._dir_mtime = os.stat(self.prompts_path).st_mtime
+            for name, path in self._template_files():
+                self._templates[name] = self._load_template(name, path)
+        return self
+
+    def get(self, name):
+        self._refresh()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"No prompt template named '{name}'")
+
+    def render(self, name, **kwargs):
+        return self.get(name).render(**kwargs)
+
+    def has_platform(self, platform):
+        return platform in self.available_platforms()
+
+    def available_platforms(self):
+        self._refresh()
+        return sorted(name for name in self._templates if name not in SHARED_TEMPLATE_PLACEHOLDERS)
+
+    def _template_files(self):
+        for filename in sorted(os.listdir(self.prompts_path)):
+            if filename.endswith('.txt'):
+                yield filename[:-len('.txt')], os.path.join(self.prompts_path, filename)
+
+    def _load_template(self, name, path):
+        with open(path, 'r') as f:
+            template = PromptTemplate(name, f.read(), os.stat(path).st_mtime)
+        expected = SHARED_TEMPLATE_PLACEHOLDERS.get(name, PLATFORM_TEMPLATE_PLACEHOLDERS)
+        if template.placeholders != expected:
+            raise ImproperlyConfigured(
+                f"Prompt template '{name}.txt' must use placeholders {sorted(expected)}, "
+                f"found {sorted(template.placeholders)}"
+            )
+        return template
+
+    def _refresh(self):
+        """Reload templates whose mtime changed, plus any added or removed files"""
+        try:
+            dir_mtime = os.stat(self.prompts_path).st_mtime
+        except OSError:
+            return
+        changed = dir_mtime != self._dir_mtime
+        if not changed:
+            for template in self._templates.values():
+                try:
+                    mtime = os.stat(os.path.join(self.prompts_path, f'{template.name}.txt')).st_mtime
+                except OSError:
+                    changed = True
+                    break
+                if mtime != template.mtime:
+                    changed = True
+                    break
+        if not changed:
+            return
+
+        with self._lock:
+            templates = {}
+            for name, path in self._template_files():
+                current = self._templates.get(name)
+                try:
+                    if current is not None and os.stat(path).st_mtime == current.mtime:
+                        templates[name] = current
+                    else:
+                        templates[name] = self._load_template(name, path)
+                        logger.info(f"Reloaded prompt template '{name}'")
+                except (OSError, ImproperlyConfigured) as e:
+                    # Keep serving the last good version of a template that fails validation
+                    logger.error(f"Could not reload prompt template '{name}': {str(e)}")
+                    if current is not None:
+                        try:
+                            # Remember the bad mtime so it isn't re-read on every call
+                            current.mtime = os.stat(path).st_mtime
+                        except OSError:
+                            pass
+                        templates[name] = current
+            self._templates = templates
+            self._dir_mtime = dir_mtime
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_prompt_registry():
+    """Return the per-process prompt registry, loading it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                prompts_path = os.path.join(settings.BASE_DIR, 'apps', 'ai_engine', 'prompts')
+                _registry = PromptRegistry(prompts_path).load()
+    return _registry
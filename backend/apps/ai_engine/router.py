@@ -0,0 +1,125 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class Backend:
+    def __init__(self, base_url, model, weight=1.0):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.weight = weight if weight > 0 else 1.0
+        self.inflight = 0
+        self.latency = None  # exponentially weighted moving average, in seconds
+        self.healthy = True
+
+    def load_score(self, default_latency=1.0):
+        """Lower is better: queued work times expected latency, scaled down by weight"""
+        latency = self.latency if self.latency is not None else default_latency
+        return (self.inflight + 1) * latency / self.weight
+
+    def __repr__(self):
+        return f"Backend({self.base_url}, model={self.model}, weight={self.weight})"
+
+def parse_backends(value, default_url, default_model):
+    """
+    Parse OLLAMA_BACKENDS: comma separated 'url[|model[|weight]]' entries.
+    Falls back to the single OLLAMA_BASE_URL / OLLAMA_MODEL pair when empty.
+    """
+    backends = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = [part.strip() for part in entry.split('|')]
+        url = parts[0]
+        model = parts[1] if len(parts) > 1 and parts[1] else default_model
+        weight = float(parts[2]) if len(parts) > 2 and parts[2] else 1.0
+        backends.append(Backend(url, model, weight))
+    if not backends:
+        backends.append(Backend(default_url, default_model))
+    return backends
+
+class BackendRouter:
+    """
+    Dispatches each generation to the least-loaded healthy backend.
+    Backends that time out or refuse connections are marked unhealthy and a
+    background thread probes /api/tags until they answer again.
+    """
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, backends, session, probe_interval=30, probe_timeout=5):
+        self.backends = backends
+        self.session = session
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    def acquire(self, exclude=()):
+        """Reserve the best backend, or None if every candidate is excluded"""
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+            # If nothing is healthy, still try someone rather than failing outright
+            healthy = [b for b in candidates if b.healthy] or candidates
+            # Backends without a measurement yet are assumed as fast as the best known one
+            known = [b.latency for b in self.backends if b.latency is not None]
+            default_latency = min(known) if known else 1.0
+            backend = min(healthy, key=lambda b: b.load_score(default_latency))
+            backend.inflight += 1
+            return backend
+
+    def release(self, backend, latency=None, failed=False):
+        with self._lock:
+            backend.inflight = max(0, backend.inflight - 1)
+            if latency is not None:
+                if backend.latency is None:
+                    backend.latency = latency
+                else:
+                    backend.latency = self.EWMA_ALPHA * latency + (1 - self.EWMA_ALPHA) * backend.latency
+            if failed and backend.healthy:
+                backend.healthy = False
+                logger.warning(f"Marking Ollama backend {backend.base_url} unhealthy")
+                self._ensure_probe()
+
+    def get_stats(self):
+        with self._lock:
+            return [
+                {
+                    'base_url': b.base_url,
+                    'model': b.model,
+                    'weight': b.weight,
+                    'inflight': b.inflight,
+                    'latency': b.latency,
+                    'healthy': b.healthy,
+                }
+                for b in self.backends
+            ]
+
+    def _ensure_probe(self):
+        if self._probe_thread is None or not self._probe_thread.is_alive():
+            self._probe_thread = threading.Thread(target=self._probe_loop, name='ollama-probe', daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                unhealthy = [b for b in self.backends if not b.healthy]
+                if not unhealthy:
+                    # Cleared under the lock, so a backend failing from here on starts a new probe
+                    self._probe_thread = None
+                    return
+            for backend in unhealthy:
+                try:
+                    response = self.session.get(f"{backend.base_url}/api/tags", timeout=self.probe_timeout)
+                    response.raise_for_status()
+                except Exception:
+                    continue
+                with self._lock:
+                    backend.healthy = True
+                    # Forget stale latency so the recovered host gets a fair share again
+                    backend.latency = None
+                logger.info(f"Ollama backend {backend.base_url} is healthy again")
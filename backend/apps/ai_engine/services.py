@@ -1,16 +1,46 @@
-import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
+from django.utils import timezone
 from .llm_client import OllamaClient
+from .prompt_registry import get_prompt_registry
+from .streaming import CaptionStreamPublisher
+from .concurrency import LLMCapacityError
 
-class PostGenerationService:
-    def __init__(self):
-        self.client = OllamaClient()
-        self.prompts_path = os.path.join(settings.BASE_DIR, 'apps', 'ai_engine', 'prompts')
+logger = logging.getLogger(__name__)
+
+# Expected shape of the combined-mode JSON response
+COMBINED_OUTPUT_SCHEMA = {
+    'base_caption': str,
+    'platforms': {
+        'caption': str,
+        'hashtags': (str, list),
+    },
+}
+
+# Hard per-platform limits on the published text: caption, blank line, hashtags (see Post.caption_for)
+PLATFORM_CAPTION_LIMITS = {
+    'twitter': 280,
+}
 
-    def _read_prompt_file(self, filename):
-        path = os.path.join(self.prompts_path, filename)
-        with open(path, 'r') as f:
-            return f.read()
+def fits_platform_limit(platform, caption, hashtags):
+    limit = PLATFORM_CAPTION_LIMITS.get(platform)
+    if not limit:
+        return True
+    length = len(caption) + (len(hashtags) + 2 if hashtags else 0)
+    return length <= limit
+
+class PostGenerationService:
+    def __init__(self, use_cache=True, resume=True):
+        self.client = OllamaClient(use_cache=use_cache)
+        # resume=True skips steps already checkpointed by an earlier attempt
+        self.resume = resume
+        self.prompts = get_prompt_registry()
+        self.max_workers = getattr(settings, 'AI_PLATFORM_MAX_WORKERS', 3)
+        self.mode = getattr(settings, 'AI_GENERATION_MODE', 'per_platform')
+        self.streaming = getattr(settings, 'AI_STREAMING_ENABLED', True)
+        self.stream = None
 
     def _parse_llm_output(self, output):
         """Parse LLM output into caption and hashtags"""
@@ -31,33 +61,205 @@ class PostGenerationService:
         
         return caption, hashtags
 
-    def generate_all_platform_text(self, post):
-        """Generate base caption and platform-specific versions"""
-        # Step 1: Generate base refined content
-        base_prompt_template = self._read_prompt_file('base.txt')
-        base_prompt = base_prompt_template.format(
+    def _parse_combined_output(self, output, platforms):
+        """
+        Validate combined-mode JSON against COMBINED_OUTPUT_SCHEMA.
+        Returns (base_caption, {platform: (caption, hashtags)}) holding only the valid fields.
+        """
+        try:
+            data = json.loads(output)
+        except (TypeError, ValueError):
+            logger.warning("Combined generation returned invalid JSON")
+            return None, {}
+        if not isinstance(data, dict):
+            return None, {}
+
+        base_caption = data.get('base_caption')
+        if not isinstance(base_caption, COMBINED_OUTPUT_SCHEMA['base_caption']) or not base_caption.strip():
+            base_caption = None
+        else:
+            base_caption = base_caption.strip()
+
+        platform_schema = COMBINED_OUTPUT_SCHEMA['platforms']
+        platform_data = data.get('platforms')
+        if not isinstance(platform_data, dict):
+            platform_data = {}
+
+        results = {}
+        for platform in platforms:
+            entry = platform_data.get(platform)
+            if not isinstance(entry, dict):
+                continue
+            caption = entry.get('caption')
+            hashtags = entry.get('hashtags', '')
+            if not isinstance(caption, platform_schema['caption']) or not caption.strip():
+                continue
+            if not isinstance(hashtags, platform_schema['hashtags']):
+                continue
+            if isinstance(hashtags, list):
+                if not all(isinstance(tag, str) for tag in hashtags):
+                    continue
+                hashtags = ' '.join(tag.strip() for tag in hashtags if tag.strip())
+
+            caption, hashtags = caption.strip(), hashtags.strip()
+            if not fits_platform_limit(platform, caption, hashtags):
+                continue
+            results[platform] = (caption, hashtags)
+
+        return base_caption, results
+
+    def _on_token(self, field):
+        return self.stream.token_callback(field) if self.stream else None
+
+    def _generate_base_caption(self, post):
+        base_prompt = self.prompts.render(
+            'base',
             content=post.content,
             goal=post.goal
         )
-        base_caption = self.client.generate(base_prompt)
-        post.base_caption = base_caption
-        
-        # Step 2: Generate platform specific versions
-        for platform in post.platforms:
+        base_caption = self.client.generate(base_prompt, on_token=self._on_token('base_caption'))
+        if self.stream:
+            self.stream.done('base_caption', caption=base_caption)
+        return base_caption
+
+    def _generate_platform_text(self, platform, platform_prompt):
+        """Run a single platform rewrite and parse it into caption and hashtags"""
+        output = self.client.generate(platform_prompt, on_token=self._on_token(platform))
+        caption, hashtags = self._parse_llm_output(output)
+        if self.stream:
+            self.stream.done(platform, caption=caption, hashtags=hashtags)
+        return caption, hashtags
+
+    def _generate_combined(self, post, platforms):
+        """Ask for the base caption and every platform caption in one JSON round-trip"""
+        prompt = self.prompts.render(
+            'combined',
+            content=post.content,
+            goal=post.goal,
+            platforms=', '.join(platforms)
+        )
+        try:
+            output = self.client.generate(prompt, format='json')
+        except LLMCapacityError:
+            raise
+        except Exception as e:
+            logger.warning(f"Combined generation failed for post {post.id}, falling back: {str(e)}")
+            return None, {}
+        return self._parse_combined_output(output, platforms)
+
+    def _generate_platforms(self, post, base_caption, platforms):
+        """Rewrite the base caption for each platform concurrently. Returns {platform: exception}"""
+        platform_prompts = {
+            platform: self.prompts.render(platform, base_content=base_caption)
+            for platform in platforms
+        }
+
+        errors = {}
+        if not platform_prompts:
+            return errors
+
+        workers = max(1, min(self.max_workers, len(platform_prompts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._generate_platform_text, platform, prompt): platform
+                for platform, prompt in platform_prompts.items()
+            }
+            for future in as_completed(futures):
+                platform = futures[future]
+                try:
+                    caption, hashtags = future.result()
+                except Exception as e:
+                    # Keep going so one failed platform doesn't discard the others
+                    logger.error(f"Generation failed for {platform} on post {post.id}: {str(e)}")
+                    errors[platform] = e
+                    self._checkpoint(post, platform, error=e)
+                    if self.stream:
+                        self.stream.error(f"{platform}: {str(e)}")
+                    continue
+
+                self._save_platform_text(post, platform, caption, hashtags)
+
+        return errors
+
+    def _save_platform_text(self, post, platform, caption, hashtags):
+        # Save to specific fields
+        setattr(post, f"{platform}_caption", caption)
+        setattr(post, f"{platform}_hashtags", hashtags)
+        self._checkpoint(post, platform, [f"{platform}_caption", f"{platform}_hashtags"])
+
+    def _checkpoint(self, post, step, fields=(), error=None):
+        """
+        Persist one finished (or failed) generation step so a retry only redoes what is missing.
+        Attempts are tracked per step under generated_outputs['generation'].
+        """
+        def record_step(outputs):
+            record = outputs.setdefault('generation', {}).setdefault(step, {'attempts': 0})
+            record['attempts'] += 1
+            record['status'] = 'failed' if error else 'done'
+            record['error'] = str(error) if error else None
+            record['updated_at'] = timezone.now().isoformat()
+
+        # Platform threads and publish tasks write generated_outputs too, so merge under the row lock
+        post.update_outputs(record_step, fields)
+
+    def _completed_steps(self, post):
+        steps = post.generated_outputs.get('generation', {})
+        return {step for step, record in steps.items() if record.get('status') == 'done'}
+
+    def generate_all_platform_text(self, post):
+        """Generate base caption and platform-specific versions"""
+        if self.streaming:
+            self.stream = CaptionStreamPublisher(post.id)
+
+        if not self.resume:
+            post.update_outputs(lambda outputs: outputs.pop('generation', None))
+        completed = self._completed_steps(post)
+
+        # Platforms are validated at post creation; this only guards older rows
+        remaining = [
+            platform for platform in post.platforms
+            if self.prompts.has_platform(platform) and platform not in completed
+        ]
+        base_caption = post.base_caption if 'base_caption' in completed else None
+
+        # Combined mode: one JSON round-trip, per-platform path only for what comes back invalid
+        if self.mode == 'combined' and (base_caption is None or remaining):
+            combined_base, results = self._generate_combined(post, remaining)
+            if base_caption is None and combined_base is not None:
+                base_caption = combined_base
+                post.base_caption = base_caption
+                self._checkpoint(post, 'base_caption', ['base_caption'])
+                if self.stream:
+                    self.stream.done('base_caption', caption=base_caption)
+            for platform, (caption, hashtags) in results.items():
+                self._save_platform_text(post, platform, caption, hashtags)
+                if self.stream:
+                    self.stream.done(platform, caption=caption, hashtags=hashtags)
+            remaining = [platform for platform in remaining if platform not in results]
+
+        # Step 1: Generate base refined content
+        if base_caption is None:
             try:
-                platform_prompt_template = self._read_prompt_file(f'{platform}.txt')
-            except FileNotFoundError:
-                continue
-            
-            platform_prompt = platform_prompt_template.format(base_content=base_caption)
-            output = self.client.generate(platform_prompt)
-            
-            caption, hashtags = self._parse_llm_output(output)
-            
-            # Save to specific fields
-            setattr(post, f"{platform}_caption", caption)
-            setattr(post, f"{platform}_hashtags", hashtags)
-        
+                base_caption = self._generate_base_caption(post)
+            except Exception as e:
+                self._checkpoint(post, 'base_caption', error=e)
+                raise
+            post.base_caption = base_caption
+            self._checkpoint(post, 'base_caption', ['base_caption'])
+
+        # Step 2: Generate platform specific versions concurrently
+        errors = self._generate_platforms(post, base_caption, remaining)
+
+        if errors:
+            # Finished platforms are already checkpointed; a retry resumes from here
+            message = f"Generation failed for platforms: {', '.join(sorted(errors))}"
+            if any(isinstance(e, LLMCapacityError) for e in errors.values()):
+                raise LLMCapacityError(message)
+            raise Exception(message)
+
         post.status = 'generated'
-        post.save()
+        # Only the status: other columns may have been written by derivative and publish tasks meanwhile
+        post.save(update_fields=['status', 'updated_at'])
+        if self.stream:
+            self.stream.complete(post.status)
         return True
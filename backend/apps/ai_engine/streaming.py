@@ -0,0 +1,123 @@
+import json
+import time
+import logging
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+def caption_stream_channel(post_id):
+    return f"post-captions:{post_id}"
+
+def _get_redis():
+    return redis.Redis.from_url(settings.CELERY_BROKER_URL)
+
+class CaptionStreamPublisher:
+    """Publishes partial captions from the Celery worker to Redis pub/sub"""
+    def __init__(self, post_id):
+        self.channel = caption_stream_channel(post_id)
+        self.redis = _get_redis()
+
+    def _publish(self, event, data):
+        try:
+            self.redis.publish(self.channel, json.dumps({'event': event, 'data': data}))
+        except redis.RedisError as e:
+            # Streaming is best effort; never fail generation because of it
+            logger.warning(f"Could not publish caption stream event: {str(e)}")
+
+    def token(self, field, delta):
+        self._publish('token', {'field': field, 'delta': delta})
+
+    def token_callback(self, field):
+        return lambda delta: self.token(field, delta)
+
+    def done(self, field, **values):
+        self._publish('done', {'field': field, **values})
+
+    def error(self, message):
+        self._publish('error', {'message': message})
+
+    def complete(self, status):
+        self._publish('complete', {'status': status})
+
+def _format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _post_snapshot(post):
+    snapshot = {'status': post.status, 'base_caption': post.base_caption}
+    for platform in post.platforms:
+        snapshot[platform] = {
+            'caption': getattr(post, f"{platform}_caption", None),
+            'hashtags': getattr(post, f"{platform}_hashtags", None),
+        }
+    return snapshot
+
+def iter_caption_events(post):
+    """
+    Server-Sent Events generator relaying a post's caption stream.
+    Starts with a snapshot of what is already saved, then forwards live tokens until
+    generation completes or AI_STREAM_TIMEOUT elapses.
+    """
+    timeout = getattr(settings, 'AI_STREAM_TIMEOUT', 600)
+    keepalive = getattr(settings, 'AI_STREAM_KEEPALIVE', 15)
+
+    pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+    # Subscribe before taking the snapshot so no token falls in between
+    pubsub.subscribe(caption_stream_channel(post.id))
+    try:
+        post.refresh_from_db()
+        yield _format_event('snapshot', _post_snapshot(post))
+        if post.status != 'generating':
+            yield _format_event('complete', {'status': post.status})
+            return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=keepalive)
+            if message is None:
+                # SSE comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.loads(message['data'])
+            yield _format_event(payload['event'], payload['data'])
+            if payload['event'] == 'complete':
+                return
+    finally:
+        pubsub.close()
+
+async def aiter_caption_events(post):
+    """
+    Async equivalent of iter_caption_events for ASGI servers, which would otherwise
+    collect a sync generator into a list and send nothing until generation finishes.
+    """
+    from redis import asyncio as aioredis
+
+    timeout = getattr(settings, 'AI_STREAM_TIMEOUT', 600)
+    keepalive = getattr(settings, 'AI_STREAM_KEEPALIVE', 15)
+
+    client = aioredis.Redis.from_url(settings.CELERY_BROKER_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before taking the snapshot so no token falls in between
+        await pubsub.subscribe(caption_stream_channel(post.id))
+        await sync_to_async(post.refresh_from_db)()
+        yield _format_event('snapshot', _post_snapshot(post))
+        if post.status != 'generating':
+            yield _format_event('complete', {'status': post.status})
+            return
+
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await pubsub.get_message(timeout=min(keepalive, remaining))
+            if message is None:
+                # SSE comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.loads(message['data'])
+            yield _format_event(payload['event'], payload['data'])
+            if payload['event'] == 'complete':
+                return
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
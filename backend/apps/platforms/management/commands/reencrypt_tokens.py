@@ -0,0 +1,76 @@
+import redis
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.platforms.models import SocialAccount
+from apps.platforms.utils import EncryptionManager
+
+CHECKPOINT_KEY = 'reencrypt-tokens:last-id'
+
+class Command(BaseCommand):
+    help = 'Re-encrypt all stored access tokens with the primary encryption key (first of ENCRYPTION_KEYS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Accounts per batch')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last batch an interrupted run committed')
+        parser.add_argument('--after-id', type=int, default=None, help='Start after this SocialAccount id')
+        parser.add_argument('--dry-run', action='store_true', help='Count tokens that need re-encryption without writing')
+
+    def handle(self, *args, **options):
+        checkpoint = None
+        if not options['dry_run']:
+            try:
+                checkpoint = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+                checkpoint.ping()
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"Checkpointing disabled, Redis unavailable: {str(e)}"))
+                checkpoint = None
+
+        last_id = options['after_id'] or 0
+        if options['resume'] and checkpoint is not None:
+            saved = checkpoint.get(CHECKPOINT_KEY)
+            if saved:
+                last_id = int(saved)
+                self.stdout.write(f"Resuming after SocialAccount {last_id}")
+
+        scanned = rotated = unreadable = 0
+        while True:
+            # Keyset pagination on id: each batch is one indexed range scan, however far in we are
+            with transaction.atomic():
+                batch = list(
+                    SocialAccount.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', '_access_token')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+
+                changed = []
+                for account in batch:
+                    if EncryptionManager.is_current(account._access_token):
+                        continue
+                    try:
+                        account._access_token = EncryptionManager.rotate(account._access_token)
+                    except InvalidToken:
+                        unreadable += 1
+                        self.stdout.write(self.style.ERROR(f"SocialAccount {account.id}: no configured key can decrypt the token"))
+                        continue
+                    changed.append(account)
+
+                if changed and not options['dry_run']:
+                    SocialAccount.objects.bulk_update(changed, ['_access_token'])
+
+            scanned += len(batch)
+            rotated += len(changed)
+            last_id = batch[-1].id
+            if checkpoint is not None:
+                checkpoint.set(CHECKPOINT_KEY, last_id)
+            self.stdout.write(f"Processed up to SocialAccount {last_id}: {scanned} scanned, {rotated} re-encrypted")
+
+        if checkpoint is not None:
+            checkpoint.delete(CHECKPOINT_KEY)
+
+        verb = 'would be re-encrypted' if options['dry_run'] else 're-encrypted'
+        self.stdout.write(self.style.SUCCESS(f"Done: {scanned} scanned, {rotated} {verb}, {unreadable} unreadable."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platforms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='socialaccount',
+            name='platform',
+            field=models.CharField(choices=[('instagram', 'Instagram'), ('linkedin', 'LinkedIn'), ('twitter', 'X (Twitter)')], max_length=20),
+        ),
+    ]
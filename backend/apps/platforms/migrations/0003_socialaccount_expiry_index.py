@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platforms', '0002_socialaccount_more_platforms'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='socialaccount',
+            index=models.Index(fields=['platform', 'expires_at'], name='socialaccount_expiry_idx'),
+        ),
+    ]
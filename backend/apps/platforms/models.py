@@ -1,10 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
-from .utils import EncryptionManager
+from .utils import EncryptionManager, get_token_cache
 
 class SocialAccount(models.Model):
     PLATFORM_CHOICES = (
         ('instagram', 'Instagram'),
+        ('linkedin', 'LinkedIn'),
+        ('twitter', 'X (Twitter)'),
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='social_accounts')
@@ -22,14 +24,22 @@ class SocialAccount(models.Model):
 
     class Meta:
         unique_together = ('user', 'platform', 'external_user_id')
+        indexes = [
+            # Backs the proactive refresh sweep: platform=... AND expires_at in a window
+            models.Index(fields=['platform', 'expires_at'], name='socialaccount_expiry_idx'),
+        ]
 
     @property
     def access_token(self):
-        return EncryptionManager.decrypt(self._access_token)
+        # Served from the per-process token cache; publish tasks read the token several times
+        if not self._access_token:
+            return None
+        return get_token_cache().get(self.pk, self._access_token)
 
     @access_token.setter
     def access_token(self, value):
         self._access_token = EncryptionManager.encrypt(value)
+        get_token_cache().invalidate(self.pk)
 
     def __str__(self):
         return f"{self.user.username} - {self.platform} ({self.external_user_id})"
@@ -0,0 +1,95 @@
+import logging
+from django.core.files.storage import default_storage
+from .models import SocialAccount
+
+logger = logging.getLogger(__name__)
+
+PUBLISHERS = {}
+
+TWEET_MAX_LENGTH = 280
+
+def register_publisher(cls):
+    """Class decorator adding a publisher adapter to the registry under cls.platform"""
+    PUBLISHERS[cls.platform] = cls()
+    return cls
+
+def get_publisher(platform):
+    return PUBLISHERS.get(platform)
+
+class Publisher:
+    """
+    Adapter publishing a post to one platform. publish() returns an outcome dict
+    with 'status' set to 'posted', 'failed' or 'pending' (finished later by the
+    platform's own tasks) and raises on errors worth retrying.
+    """
+    platform = None
+
+    def get_account(self, post):
+        return SocialAccount.objects.filter(user=post.user, platform=self.platform).first()
+
+    def publish(self, post, account):
+        raise NotImplementedError
+
+@register_publisher
+class InstagramPublisher(Publisher):
+    platform = 'instagram'
+
+    def publish(self, post, account):
+        # Meta processes media asynchronously, so the container/poll/publish chain
+        # reports the final outcome itself
+        from apps.posts.tasks import publish_instagram_post
+        publish_instagram_post.delay(post.id)
+        return {'status': 'pending'}
+
+@register_publisher
+class LinkedInPublisher(Publisher):
+    platform = 'linkedin'
+
+    def publish(self, post, account):
+        from apps.posts.derivatives import ensure_post_derivatives
+        from .services.linkedin import LinkedInService
+
+        author_urn = account.external_user_id
+        if not author_urn.startswith('urn:'):
+            author_urn = f"urn:li:person:{author_urn}"
+
+        image_urn = None
+        if post.media_items():
+            # LinkedIn takes uploaded bytes rather than a URL; only the first image is used
+            ensure_post_derivatives(post, [self.platform])
+            image, derivatives = post.media_items()[0]
+            name = derivatives.get(self.platform)
+            # Never fall back to the original: it may not meet LinkedIn's size and ratio limits
+            if derivatives.get('source') != image.name or not name or not default_storage.exists(name):
+                raise Exception(f"No current {self.platform} derivative for {image.name}")
+            with default_storage.open(name, 'rb') as image_file:
+                image_data = image_file.read()
+            image_urn = LinkedInService.upload_image(author_urn, account.access_token, image_data)
+
+        post_urn = LinkedInService.create_post(author_urn, account.access_token, post.caption_for('linkedin'), image_urn)
+        return {'status': 'posted', 'id': post_urn}
+
+def fit_tweet(caption, hashtags, limit=TWEET_MAX_LENGTH):
+    """
+    Caption plus as many whole hashtags as fit in limit characters, counting the
+    blank line between them. The caption is only cut when it is too long on its own.
+    """
+    caption = caption.strip()
+    if len(caption) > limit:
+        return caption[:limit - 1].rstrip() + '\u2026'
+    tags = (hashtags or '').split()
+    while tags and len(caption) + 2 + len(' '.join(tags)) > limit:
+        tags.pop()
+    return f"{caption}\n\n{' '.join(tags)}" if tags else caption
+
+@register_publisher
+class TwitterPublisher(Publisher):
+    """Text-only: images need X's separate media upload API, so attached images are not sent"""
+    platform = 'twitter'
+
+    def publish(self, post, account):
+        from .services.twitter import TwitterService
+
+        text = fit_tweet(post.twitter_caption or post.content, post.twitter_hashtags)
+        tweet_id = TwitterService.create_tweet(account.access_token, text)
+        return {'status': 'posted', 'id': tweet_id}
@@ -0,0 +1,104 @@
+import time
+import logging
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Refill every bucket, then take one token from all of them or from none.
+# ARGV: now, then (capacity, period) per key. Returns seconds to wait (0 = acquired).
+_RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local states = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = capacity / tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    states[i] = {tokens, rate, capacity}
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local tokens, rate, capacity = states[i][1], states[i][2], states[i][3]
+    redis.call('HSET', key, 'tokens', tokens - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) * 2)
+end
+return '0'
+"""
+
+class TokenBucketLimiter:
+    """
+    Redis-backed token buckets shared by every worker.
+    A bucket (key, capacity, period) holds up to capacity tokens and refills at capacity/period per second.
+    """
+    def __init__(self, client):
+        self.redis = client
+        self._reserve = self.redis.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self, buckets):
+        """Take one token from every bucket atomically. Returns 0, or the seconds until one is free"""
+        args = [time.time()]
+        for _, capacity, period in buckets:
+            args.extend([capacity, period])
+        return float(self._reserve(keys=[key for key, _, _ in buckets], args=args))
+
+    def sync(self, key, capacity, period, remaining):
+        """Overwrite a bucket's level with a quota reported by the platform"""
+        ttl = int(period) * 2
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={'tokens': max(0, min(capacity, remaining)), 'ts': time.time(), 'synced': time.time()})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def needs_sync(self, key, interval):
+        synced = self.redis.hget(key, 'synced')
+        return synced is None or time.time() - float(synced) >= interval
+
+def get_rate_limiter():
+    return TokenBucketLimiter(redis.Redis.from_url(settings.CELERY_BROKER_URL))
+
+def instagram_publish_buckets(ig_user_id):
+    """Per IG user content publishing cap plus the app-wide call budget"""
+    return [
+        (
+            f"ratelimit:instagram:user:{ig_user_id}",
+            getattr(settings, 'INSTAGRAM_PUBLISH_LIMIT', 50),
+            getattr(settings, 'INSTAGRAM_PUBLISH_LIMIT_PERIOD', 86400),
+        ),
+        (
+            f"ratelimit:instagram:app:{getattr(settings, 'META_APP_ID', '')}",
+            getattr(settings, 'INSTAGRAM_APP_PUBLISH_LIMIT', 200),
+            getattr(settings, 'INSTAGRAM_APP_PUBLISH_LIMIT_PERIOD', 3600),
+        ),
+    ]
+
+def reserve_instagram_publish(social_account):
+    """
+    Take a publish token for this IG account. Returns 0, or the seconds to wait before retrying.
+    With INSTAGRAM_SYNC_PUBLISHING_LIMIT the user bucket is periodically resynced from the
+    Graph API's content_publishing_limit endpoint.
+    """
+    limiter = get_rate_limiter()
+    buckets = instagram_publish_buckets(social_account.external_user_id)
+
+    if getattr(settings, 'INSTAGRAM_SYNC_PUBLISHING_LIMIT', False):
+        user_key = buckets[0][0]
+        if limiter.needs_sync(user_key, getattr(settings, 'INSTAGRAM_QUOTA_SYNC_INTERVAL', 300)):
+            from .services.instagram import InstagramService
+            quota = InstagramService.get_content_publishing_limit(
+                social_account.external_user_id,
+                social_account.access_token
+            )
+            if quota:
+                buckets[0] = (user_key, quota['quota_total'], quota['quota_duration'])
+                limiter.sync(user_key, quota['quota_total'], quota['quota_duration'], quota['quota_total'] - quota['quota_usage'])
+
+    return limiter.reserve(buckets)
@@ -0,0 +1,234 @@
+import json
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Graph API error codes Meta documents as temporary / throttling
+TRANSIENT_ERROR_CODES = {1, 2, 4, 17, 32, 341, 613, 80001, 80002}
+
+class AmbiguousWriteError(Exception):
+    """A write that was sent but got no usable answer, so it may or may not have been applied"""
+
+class GraphThrottle:
+    """
+    Usage reported by Meta in X-App-Usage / X-Business-Use-Case-Usage, shared by all
+    workers through Redis so everyone slows down before Meta starts rejecting calls.
+    Falls back to process-local state when Redis is unavailable.
+    """
+    KEY = 'graph-api-usage'
+
+    def __init__(self, redis_url=None, soft_limit=75, hard_limit=95, max_delay=30):
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.max_delay = max_delay
+        self._local = {}
+        self._redis = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+
+    @staticmethod
+    def parse_headers(headers):
+        """Return (highest usage percentage, seconds until access is regained)"""
+        usage = 0
+        regain = 0
+        app_usage = headers.get('X-App-Usage')
+        if app_usage:
+            try:
+                usage = max([usage] + [v for v in json.loads(app_usage).values() if isinstance(v, (int, float))])
+            except (ValueError, AttributeError):
+                pass
+        buc_usage = headers.get('X-Business-Use-Case-Usage')
+        if buc_usage:
+            try:
+                for entries in json.loads(buc_usage).values():
+                    for entry in entries:
+                        usage = max(usage, entry.get('call_count', 0), entry.get('total_time', 0), entry.get('total_cputime', 0))
+                        # Meta reports this in minutes
+                        regain = max(regain, entry.get('estimated_time_to_regain_access', 0) * 60)
+            except (ValueError, AttributeError):
+                pass
+        return usage, regain
+
+    def update(self, headers):
+        # Responses without usage headers say nothing; a 0% reading does (usage dropped back)
+        if not headers.get('X-App-Usage') and not headers.get('X-Business-Use-Case-Usage'):
+            return
+        usage, regain = self.parse_headers(headers)
+        state = {'usage': usage, 'regain_at': time.time() + regain if regain else 0, 'updated_at': time.time()}
+        self._local = state
+        if self._redis is not None:
+            try:
+                self._redis.hset(self.KEY, mapping=state)
+                self._redis.expire(self.KEY, 3600)
+            except Exception as e:
+                logger.warning(f"Could not share Graph API usage: {str(e)}")
+
+    def _state(self):
+        if self._redis is not None:
+            try:
+                state = self._redis.hgetall(self.KEY)
+                if state:
+                    return {k.decode(): float(v) for k, v in state.items()}
+            except Exception:
+                pass
+        return self._local
+
+    def delay(self):
+        """Seconds callers should hold off before the next Graph call"""
+        state = self._state()
+        if not state:
+            return 0
+        regain_in = state.get('regain_at', 0) - time.time()
+        if regain_in > 0:
+            return regain_in
+        usage = state.get('usage', 0)
+        if usage >= self.hard_limit:
+            return self.max_delay
+        if usage > self.soft_limit:
+            return self.max_delay * (usage - self.soft_limit) / (self.hard_limit - self.soft_limit)
+        return 0
+
+class GraphClient:
+    """
+    Process-wide Graph API client: pooled keep-alive connections, default timeouts,
+    jittered exponential backoff on transient errors and shared usage throttling.
+    """
+    def __init__(self, timeout=(5, 30), max_retries=3, backoff_base=1, backoff_max=30, throttle=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttle = throttle or GraphThrottle()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=getattr(settings, 'GRAPH_POOL_SIZE', 20))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def create(self, url, **kwargs):
+        """
+        POST that creates something on the platform. Raises AmbiguousWriteError when the
+        request may have been applied (dropped connection, read timeout, 5xx), so callers
+        don't retry it into a duplicate.
+        """
+        try:
+            response = self.post(url, **kwargs)
+        except requests.exceptions.ConnectTimeout:
+            # Never reached the platform
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout) as e:
+            raise AmbiguousWriteError(f"POST {url} failed: {str(e)}") from e
+        if response.status_code >= 500:
+            raise AmbiguousWriteError(f"POST {url} returned {response.status_code}")
+        return response
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            delay = min(self.throttle.delay(), self.throttle.max_delay)
+            if delay > 0:
+                logger.info(f"Graph API usage is high, waiting {delay:.1f}s")
+                time.sleep(delay)
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # A POST that timed out while reading may already have been applied by Meta
+                if not self._can_retry(method, e, attempt):
+                    raise
+                attempt += 1
+                self._backoff(attempt, f"{method} {url} failed: {str(e)}")
+                continue
+
+            self.throttle.update(response.headers)
+            if self._is_transient(method, response) and attempt < self.max_retries:
+                attempt += 1
+                self._backoff(attempt, f"{method} {url} returned a transient error ({response.status_code})")
+                continue
+            return response
+
+    def _can_retry(self, method, exc, attempt):
+        if attempt >= self.max_retries:
+            return False
+        if method == 'GET':
+            return True
+        # Only retry writes that certainly never reached Meta
+        return isinstance(exc, requests.exceptions.ConnectTimeout)
+
+    @staticmethod
+    def _is_transient(method, response):
+        # A 5xx on a write is ambiguous, so only reads are retried on it
+        if response.status_code >= 500:
+            return method == 'GET'
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        # LinkedIn and X reuse this client; their bodies can be lists or OAuth-style {"error": "..."}
+        error = body.get('error') if isinstance(body, dict) else None
+        if not isinstance(error, dict):
+            return False
+        return bool(error.get('is_transient')) or error.get('code') in TRANSIENT_ERROR_CODES
+
+    def _backoff(self, attempt, reason):
+        # Full jitter: random sleep up to the exponential cap
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        logger.warning(f"{reason}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_graph_client():
+    """Return the per-process Graph API client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GraphClient(
+                    timeout=(
+                        getattr(settings, 'GRAPH_CONNECT_TIMEOUT', 5),
+                        getattr(settings, 'GRAPH_READ_TIMEOUT', 30),
+                    ),
+                    max_retries=getattr(settings, 'GRAPH_MAX_RETRIES', 3),
+                    throttle=GraphThrottle(
+                        redis_url=settings.CELERY_BROKER_URL,
+                        soft_limit=getattr(settings, 'GRAPH_USAGE_SOFT_LIMIT', 75),
+                        hard_limit=getattr(settings, 'GRAPH_USAGE_HARD_LIMIT', 95),
+                    )
+                )
+    return _client
+
+_platform_client = None
+
+def get_platform_client():
+    """
+    Pooled client for the other platforms' APIs (LinkedIn, X). Same retry and
+    timeout behaviour, but it neither reads nor waits on Meta's usage headers.
+    """
+    global _platform_client
+    if _platform_client is None:
+        with _client_lock:
+            if _platform_client is None:
+                _platform_client = GraphClient(
+                    timeout=(
+                        getattr(settings, 'GRAPH_CONNECT_TIMEOUT', 5),
+                        getattr(settings, 'GRAPH_READ_TIMEOUT', 30),
+                    ),
+                    max_retries=getattr(settings, 'GRAPH_MAX_RETRIES', 3),
+                    throttle=GraphThrottle()
+                )
+    return _platform_client
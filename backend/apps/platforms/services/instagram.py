@@ -1,7 +1,7 @@
-import requests
 from django.conf import settings
 from datetime import datetime, timedelta
 import logging
+from .graph_client import get_graph_client
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +53,7 @@ class InstagramService:
             'redirect_uri': config['redirect_uri'],
             'code': code
         }
-        response = requests.get(token_url, params=params)
+        response = get_graph_client().get(token_url, params=params)
         data = response.json()
         
         if 'error' in data:
@@ -63,14 +63,23 @@ class InstagramService:
         short_token = data['access_token']
 
         # 2. Exchange for long-lived token
+        return cls.exchange_for_long_lived_token(short_token)
+
+    @classmethod
+    def exchange_for_long_lived_token(cls, token):
+        """
+        Exchange a short-lived token, or a still-valid long-lived one, for a fresh
+        long-lived token. Returns the Graph payload with access_token and expires_in.
+        """
+        config = cls._get_config()
         exchange_url = f"{config['base_url']}/oauth/access_token"
         params = {
             'grant_type': 'fb_exchange_token',
             'client_id': config['app_id'],
             'client_secret': config['app_secret'],
-            'fb_exchange_token': short_token
+            'fb_exchange_token': token
         }
-        response = requests.get(exchange_url, params=params)
+        response = get_graph_client().get(exchange_url, params=params)
         data = response.json()
         
         if 'error' in data:
@@ -89,7 +98,7 @@ class InstagramService:
             'access_token': f"{config['app_id']}|{config['app_secret']}"
         }
         try:
-            response = requests.get(url, params=params).json()
+            response = get_graph_client().get(url, params=params).json()
             data = response.get('data', {})
             logger.info(f"Token Debug Info: {data}")
             return data
@@ -118,7 +127,7 @@ class InstagramService:
             'limit': 100
         }
         
-        response = requests.get(pages_url, params=params)
+        response = get_graph_client().get(pages_url, params=params)
         data = response.json()
         
         # 2. Strategy B: Nested /me?fields=accounts
@@ -129,7 +138,7 @@ class InstagramService:
                 'access_token': access_token
             }
             try:
-                me_acc_response = requests.get(me_acc_url, params=me_acc_params).json()
+                me_acc_response = get_graph_client().get(me_acc_url, params=me_acc_params).json()
                 if 'accounts' in me_acc_response:
                     data = me_acc_response['accounts']
             except Exception:
@@ -201,7 +210,7 @@ class InstagramService:
                 'fields': 'instagram_business_account',
                 'access_token': access_token
             }
-            ig_response = requests.get(ig_url, params=params).json()
+            ig_response = get_graph_client().get(ig_url, params=params).json()
             
             logger.info(f"Checking Page '{page_name}' ({page_id}) for IG account: {ig_response}")
             print(f"DEBUG: Checking Page '{page_name}' ({page_id}) for IG account -> {ig_response}")
@@ -215,8 +224,8 @@ class InstagramService:
         raise Exception(f"No Instagram Business Account linked to the managed Facebook pages ({len(data['data'])} pages found).")
 
     @classmethod
-    def create_media_container(cls, ig_user_id, access_token, image_url, caption):
-        """Step 1: Create a media container"""
+    def create_media_container(cls, ig_user_id, access_token, image_url, caption, is_carousel_item=False):
+        """Step 1: Create a media container (a caption-less child when is_carousel_item)"""
         config = cls._get_config()
         # If META_TEST_IMAGE is set, use it instead of the local URL
         test_image = getattr(settings, 'META_TEST_IMAGE', None)
@@ -227,10 +236,13 @@ class InstagramService:
         url = f"{config['base_url']}/{ig_user_id}/media"
         payload = {
             'image_url': image_url,
-            'caption': caption,
             'access_token': access_token
         }
-        response = requests.post(url, data=payload)
+        if is_carousel_item:
+            payload['is_carousel_item'] = 'true'
+        else:
+            payload['caption'] = caption
+        response = get_graph_client().post(url, data=payload)
         data = response.json()
         
         if 'id' not in data:
@@ -239,6 +251,26 @@ class InstagramService:
         
         return data['id']
 
+    @classmethod
+    def create_carousel_container(cls, ig_user_id, access_token, children, caption):
+        """Step 1 for carousels: create the parent container from finished child containers"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/{ig_user_id}/media"
+        payload = {
+            'media_type': 'CAROUSEL',
+            'children': ','.join(children),
+            'caption': caption,
+            'access_token': access_token
+        }
+        response = get_graph_client().post(url, data=payload)
+        data = response.json()
+
+        if 'id' not in data:
+            logger.error(f"Error creating carousel container: {data}")
+            raise Exception(data.get('error', {}).get('message', 'Failed to create carousel container'))
+
+        return data['id']
+
     @classmethod
     def publish_media(cls, ig_user_id, access_token, creation_id):
         """Step 2: Publish the media container"""
@@ -248,7 +280,7 @@ class InstagramService:
             'creation_id': creation_id,
             'access_token': access_token
         }
-        response = requests.post(url, data=payload)
+        response = get_graph_client().post(url, data=payload)
         data = response.json()
         
         if 'id' not in data:
@@ -256,3 +288,41 @@ class InstagramService:
             raise Exception(data.get('error', {}).get('message', 'Failed to publish media'))
         
         return data['id']
+
+    @classmethod
+    def get_container_status(cls, container_id, access_token):
+        """Processing state of a media container: IN_PROGRESS, FINISHED, ERROR, EXPIRED or PUBLISHED"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/{container_id}"
+        params = {
+            'fields': 'status_code',
+            'access_token': access_token
+        }
+        data = get_graph_client().get(url, params=params).json()
+
+        if 'status_code' not in data:
+            logger.error(f"Error reading media container status: {data}")
+            raise Exception(data.get('error', {}).get('message', 'Failed to read media container status'))
+
+        return data['status_code']
+
+    @classmethod
+    def get_content_publishing_limit(cls, ig_user_id, access_token):
+        """Current publishing quota usage for an IG user, or None if Meta doesn't report it"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/{ig_user_id}/content_publishing_limit"
+        params = {
+            'fields': 'quota_usage,config',
+            'access_token': access_token
+        }
+        try:
+            data = get_graph_client().get(url, params=params).json()
+            entry = data['data'][0]
+            return {
+                'quota_usage': int(entry.get('quota_usage', 0)),
+                'quota_total': int(entry['config']['quota_total']),
+                'quota_duration': int(entry['config']['quota_duration']),
+            }
+        except Exception as e:
+            logger.warning(f"Could not read content publishing limit for {ig_user_id}: {str(e)}")
+            return None
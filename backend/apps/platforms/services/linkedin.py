@@ -0,0 +1,78 @@
+from django.conf import settings
+import logging
+from .graph_client import get_platform_client
+
+logger = logging.getLogger(__name__)
+
+class LinkedInService:
+    @classmethod
+    def _get_config(cls):
+        return {
+            'base_url': getattr(settings, 'LINKEDIN_API_BASE', 'https://api.linkedin.com'),
+            'version': getattr(settings, 'LINKEDIN_API_VERSION', '202401'),
+        }
+
+    @classmethod
+    def _headers(cls, access_token):
+        return {
+            'Authorization': f"Bearer {access_token}",
+            'LinkedIn-Version': cls._get_config()['version'],
+            'X-Restli-Protocol-Version': '2.0.0',
+        }
+
+    @classmethod
+    def upload_image(cls, author_urn, access_token, image_data):
+        """Register an image upload, PUT the bytes, and return the image URN"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/rest/images?action=initializeUpload"
+        payload = {'initializeUploadRequest': {'owner': author_urn}}
+        response = get_platform_client().post(url, json=payload, headers=cls._headers(access_token))
+        data = response.json()
+
+        if 'value' not in data:
+            logger.error(f"Error initializing LinkedIn image upload: {data}")
+            raise Exception(data.get('message', 'Failed to initialize LinkedIn image upload'))
+
+        upload = get_platform_client().request(
+            'PUT',
+            data['value']['uploadUrl'],
+            data=image_data,
+            headers={'Authorization': f"Bearer {access_token}"}
+        )
+        if upload.status_code >= 400:
+            logger.error(f"Error uploading LinkedIn image: {upload.status_code} {upload.text}")
+            raise Exception('Failed to upload LinkedIn image')
+
+        return data['value']['image']
+
+    @classmethod
+    def create_post(cls, author_urn, access_token, text, image_urn=None):
+        """Publish a member or organization post and return its URN"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/rest/posts"
+        payload = {
+            'author': author_urn,
+            'commentary': text,
+            'visibility': 'PUBLIC',
+            'distribution': {
+                'feedDistribution': 'MAIN_FEED',
+                'targetEntities': [],
+                'thirdPartyDistributionChannels': [],
+            },
+            'lifecycleState': 'PUBLISHED',
+        }
+        if image_urn:
+            payload['content'] = {'media': {'id': image_urn}}
+
+        response = get_platform_client().create(url, json=payload, headers=cls._headers(access_token))
+        post_urn = response.headers.get('x-restli-id')
+
+        if response.status_code != 201 or not post_urn:
+            logger.error(f"Error creating LinkedIn post: {response.status_code} {response.text}")
+            try:
+                message = response.json().get('message')
+            except ValueError:
+                message = None
+            raise Exception(message or 'Failed to create LinkedIn post')
+
+        return post_urn
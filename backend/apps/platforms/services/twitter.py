@@ -0,0 +1,30 @@
+from django.conf import settings
+import logging
+from .graph_client import get_platform_client
+
+logger = logging.getLogger(__name__)
+
+class TwitterService:
+    @classmethod
+    def _get_config(cls):
+        return {
+            'base_url': getattr(settings, 'TWITTER_API_BASE', 'https://api.twitter.com'),
+        }
+
+    @classmethod
+    def create_tweet(cls, access_token, text):
+        """Post a text tweet with an OAuth 2.0 user token and return its ID"""
+        config = cls._get_config()
+        url = f"{config['base_url']}/2/tweets"
+        response = get_platform_client().create(
+            url,
+            json={'text': text},
+            headers={'Authorization': f"Bearer {access_token}"}
+        )
+        data = response.json()
+
+        if 'data' not in data:
+            logger.error(f"Error creating tweet: {data}")
+            raise Exception(data.get('detail') or data.get('title') or 'Failed to create tweet')
+
+        return data['data']['id']
@@ -0,0 +1,76 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import SocialAccount
+from .services.instagram import InstagramService
+from .utils import get_token_cache
+
+logger = logging.getLogger(__name__)
+
+def _refresh_account(account):
+    """Returns (account, token payload or None, error or None); runs on a pool thread"""
+    try:
+        return account, InstagramService.exchange_for_long_lived_token(account.access_token), None
+    except Exception as e:
+        return account, None, str(e)
+
+@shared_task
+def refresh_expiring_tokens():
+    """
+    Refresh Instagram tokens expiring within TOKEN_REFRESH_WINDOW_DAYS before they lapse.
+    Walks the (platform, expires_at) index in id-keyed batches, refreshes each batch
+    with bounded concurrency and writes the results back with one bulk_update.
+    """
+    now = timezone.now()
+    window = timedelta(days=getattr(settings, 'TOKEN_REFRESH_WINDOW_DAYS', 7))
+    batch_size = getattr(settings, 'TOKEN_REFRESH_BATCH_SIZE', 100)
+    workers = getattr(settings, 'TOKEN_REFRESH_CONCURRENCY', 4)
+
+    # Tokens that already expired can't be exchanged; the user has to reconnect
+    expiring = SocialAccount.objects.filter(
+        platform='instagram',
+        expires_at__gt=now,
+        expires_at__lte=now + window
+    ).order_by('id')
+
+    refreshed = failed = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(expiring.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = []
+            renewed = []
+            for account, data, error in executor.map(_refresh_account, batch):
+                metadata = dict(account.metadata or {})
+                if error:
+                    failed += 1
+                    metadata['token_refresh_error'] = error
+                    logger.error(f"Could not refresh token for SocialAccount {account.id}: {error}")
+                else:
+                    refreshed += 1
+                    account.access_token = data['access_token']
+                    account.expires_at = timezone.now() + timedelta(seconds=data.get('expires_in', 5184000))
+                    metadata.pop('token_refresh_error', None)
+                    metadata['token_refreshed_at'] = timezone.now().isoformat()
+                    renewed.append(account)
+                account.metadata = metadata
+                changed.append(account)
+
+            # Failed accounts only get their metadata written: their token is the one read at
+            # batch start, and writing it back could clobber one the OAuth callback just stored
+            with transaction.atomic():
+                SocialAccount.objects.bulk_update(renewed, ['_access_token', 'expires_at'])
+                SocialAccount.objects.bulk_update(changed, ['metadata'])
+            get_token_cache().invalidate(*[account.id for account in renewed])
+
+    if refreshed or failed:
+        logger.info(f"Token refresh: {refreshed} refreshed, {failed} failed")
+    return {'refreshed': refreshed, 'failed': failed}
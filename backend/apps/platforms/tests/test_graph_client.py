@@ -0,0 +1,32 @@
+from unittest import mock
+import requests
+from django.test import SimpleTestCase
+from apps.platforms.services.graph_client import GraphClient, AmbiguousWriteError
+
+class GraphClientCreateTests(SimpleTestCase):
+    def setUp(self):
+        self.client = GraphClient(max_retries=0)
+        self.client.throttle.delay = lambda: 0
+
+    def test_dropped_connection_and_read_timeout_are_ambiguous(self):
+        for exc in (requests.exceptions.ConnectionError('reset'), requests.exceptions.ReadTimeout('slow')):
+            with mock.patch.object(self.client.session, 'request', side_effect=exc):
+                with self.assertRaises(AmbiguousWriteError):
+                    self.client.create('https://api.example.com/posts', json={})
+
+    def test_server_error_is_ambiguous(self):
+        response = mock.Mock(status_code=503, headers={})
+        with mock.patch.object(self.client.session, 'request', return_value=response):
+            with self.assertRaises(AmbiguousWriteError):
+                self.client.create('https://api.example.com/posts', json={})
+
+    def test_connect_timeout_never_reached_the_platform(self):
+        with mock.patch.object(self.client.session, 'request', side_effect=requests.exceptions.ConnectTimeout('down')):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.client.create('https://api.example.com/posts', json={})
+
+    def test_success_and_client_errors_are_returned(self):
+        for status_code in (201, 422):
+            response = mock.Mock(status_code=status_code, headers={})
+            with mock.patch.object(self.client.session, 'request', return_value=response):
+                self.assertIs(self.client.create('https://api.example.com/posts', json={}), response)
@@ -1,26 +1,54 @@
+import time
 import base64
-from cryptography.fernet import Fernet
+import logging
+import threading
+from collections import OrderedDict
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 class EncryptionManager:
+    # Built once per process and reused until the configured keys change
+    _fernet = None
+    _primary = None
+    _fernet_keys = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def get_fernet():
-        key = getattr(settings, 'ENCRYPTION_KEY', None)
-        if not key:
-            key = base64.urlsafe_b64encode(b'dev-fallback-key-32-bytes-long!!!').decode()
-        
+    def get_keys():
+        """
+        Ordered keys: ENCRYPTION_KEYS (newest first) when set, else ENCRYPTION_KEY.
+        The first key encrypts; all of them can decrypt, so old keys keep working during rotation.
+        """
+        keys = getattr(settings, 'ENCRYPTION_KEYS', None) or [getattr(settings, 'ENCRYPTION_KEY', None)]
+        keys = [key for key in keys if key]
+        if not keys:
+            keys = [base64.urlsafe_b64encode(b'dev-fallback-key-32-bytes-long!!!').decode()]
+
         # Ensure it is bytes and clean
-        if isinstance(key, str):
-            key = key.strip().encode()
-            
+        return tuple(key.strip().encode() if isinstance(key, str) else key for key in keys)
+
+    @staticmethod
+    def _build_fernet(key):
         try:
             return Fernet(key)
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"ENCRYPTION ERROR: Key length is {len(key)}. Fernet key must be 32 base64-encoded bytes (44 chars).")
             raise e
 
+    @classmethod
+    def get_fernet(cls):
+        keys = cls.get_keys()
+        if cls._fernet is None or cls._fernet_keys != keys:
+            with cls._lock:
+                if cls._fernet is None or cls._fernet_keys != keys:
+                    fernets = [cls._build_fernet(key) for key in keys]
+                    cls._fernet = MultiFernet(fernets)
+                    cls._primary = fernets[0]
+                    cls._fernet_keys = keys
+        return cls._fernet
+
     @classmethod
     def encrypt(cls, text):
         if not text:
@@ -34,3 +62,75 @@ class EncryptionManager:
             return None
         f = cls.get_fernet()
         return f.decrypt(encrypted_text.encode()).decode()
+
+    @classmethod
+    def rotate(cls, encrypted_text):
+        """Re-encrypt a token under the primary key (raises InvalidToken if no key can read it)"""
+        if not encrypted_text:
+            return encrypted_text
+        return cls.get_fernet().rotate(encrypted_text.encode()).decode()
+
+    @classmethod
+    def is_current(cls, encrypted_text):
+        """True when the token is already encrypted with the primary key"""
+        if not encrypted_text:
+            return True
+        try:
+            cls.get_fernet()
+            cls._primary.decrypt(encrypted_text.encode())
+            return True
+        except InvalidToken:
+            return False
+
+
+class TokenCache:
+    """
+    Process-local LRU of decrypted access tokens with a TTL, so hot publish paths
+    skip decryption. Entries are tied to the ciphertext they came from, so a token
+    changed by another process is never served stale.
+    """
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id, ciphertext):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is not None:
+                cached_ciphertext, token, expires_at = entry
+                if cached_ciphertext == ciphertext and expires_at > now:
+                    self._entries.move_to_end(account_id)
+                    return token
+                del self._entries[account_id]
+
+        token = EncryptionManager.decrypt(ciphertext)
+        self.set(account_id, ciphertext, token)
+        return token
+
+    def set(self, account_id, ciphertext, token):
+        if self.ttl <= 0 or account_id is None:
+            return
+        with self._lock:
+            self._entries[account_id] = (ciphertext, token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(account_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *account_ids):
+        with self._lock:
+            for account_id in account_ids:
+                self._entries.pop(account_id, None)
+
+_token_cache = None
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(
+            max_entries=getattr(settings, 'TOKEN_CACHE_MAX_ENTRIES', 1024),
+            ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300)
+        )
+    return _token_cache
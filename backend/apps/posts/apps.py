@@ -3,3 +3,17 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.posts'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .models import Post
+        from . import events
+        from .stats import post_saved, post_deleted
+
+        # Push changes to connected clients; connected first because it reads the
+        # previously loaded status that the stats handler then resets
+        post_save.connect(events.post_saved, sender=Post, dispatch_uid='posts.events.post_saved')
+        post_delete.connect(events.post_deleted, sender=Post, dispatch_uid='posts.events.post_deleted')
+        # Keep the dashboard counters in step with every saved or deleted post
+        post_save.connect(post_saved, sender=Post, dispatch_uid='posts.stats.post_saved')
+        post_delete.connect(post_deleted, sender=Post, dispatch_uid='posts.stats.post_deleted')
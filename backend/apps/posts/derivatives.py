@@ -0,0 +1,140 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# Target dimensions per platform. Aspect ratios outside [min_ratio, max_ratio] are
+# center-cropped into range, then the image is scaled down to fit max_width x max_height.
+PLATFORM_IMAGE_SPECS = {
+    # Feed images: 4:5 portrait to 1.91:1 landscape, 1080px wide, 8MB JPEG cap
+    'instagram': {'min_ratio': 4 / 5, 'max_ratio': 1.91, 'max_width': 1080, 'max_height': 1350, 'format': 'JPEG', 'max_bytes': 8 * 1024 * 1024},
+    # Shared images render best at 1200x627 (1.91:1); square and portrait are allowed
+    'linkedin': {'min_ratio': 4 / 5, 'max_ratio': 1.91, 'max_width': 1200, 'max_height': 1500, 'format': 'JPEG', 'max_bytes': 5 * 1024 * 1024},
+    # In-stream photos: 16:9 preview, up to 4096px, 5MB
+    'twitter': {'min_ratio': 1 / 2, 'max_ratio': 16 / 9, 'max_width': 1600, 'max_height': 1600, 'format': 'WEBP', 'max_bytes': 5 * 1024 * 1024},
+}
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_render_pool = None
+
+def get_render_pool():
+    """Shared thread pool for rendering; Pillow releases the GIL while resizing and encoding"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2))
+    return _render_pool
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def derivative_name(digest, platform, spec):
+    """Storage key for a derivative; identical uploads share it and are processed once"""
+    return f"derivatives/{digest[:2]}/{digest}/{platform}.{FORMAT_EXTENSIONS[spec['format']]}"
+
+def render_derivative(data, spec):
+    """Crop, resize and re-encode one image to a platform spec. Runs on a pool thread."""
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    width, height = image.size
+    ratio = width / height
+    if ratio > spec['max_ratio']:
+        new_width = int(height * spec['max_ratio'])
+        left = (width - new_width) // 2
+        image = image.crop((left, 0, left + new_width, height))
+    elif ratio < spec['min_ratio']:
+        new_height = int(width / spec['min_ratio'])
+        top = (height - new_height) // 2
+        image = image.crop((0, top, width, top + new_height))
+
+    image.thumbnail((spec['max_width'], spec['max_height']), Image.LANCZOS)
+
+    # Step the quality down until the file fits the platform's size cap
+    for quality in (85, 75, 65, 55):
+        output = io.BytesIO()
+        if spec['format'] == 'JPEG':
+            image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(output, spec['format'], quality=quality, method=4)
+        if output.tell() <= spec['max_bytes']:
+            break
+    return output.getvalue()
+
+def build_derivatives(image_file, platforms):
+    """
+    Produce (or reuse) a derivative of image_file for each platform.
+    Returns {platform: storage name}.
+    """
+    image_file.open('rb')
+    try:
+        data = image_file.read()
+    finally:
+        image_file.close()
+
+    digest = content_hash(data)
+    names, pending = {}, {}
+    for platform in platforms:
+        spec = PLATFORM_IMAGE_SPECS.get(platform)
+        if not spec:
+            continue
+        name = derivative_name(digest, platform, spec)
+        if default_storage.exists(name):
+            names[platform] = name
+        else:
+            pending[platform] = (name, spec)
+
+    if not pending:
+        return names
+
+    pool = get_render_pool()
+    futures = {platform: pool.submit(render_derivative, data, spec) for platform, (name, spec) in pending.items()}
+    rendered = {platform: future.result() for platform, future in futures.items()}
+
+    for platform, content in rendered.items():
+        name = pending[platform][0]
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+        names[platform] = name
+        logger.info(f"Built {platform} derivative {name} ({len(content)} bytes)")
+    return names
+
+def ensure_derivatives(image_file, derivatives, platforms):
+    """
+    Return an up-to-date derivative map for image_file, rebuilding it when the
+    source image changed or a platform is missing. The map records its source
+    so a replaced upload is never published with a stale derivative.
+    """
+    wanted = [platform for platform in platforms if platform in PLATFORM_IMAGE_SPECS]
+    current = derivatives or {}
+    if current.get('source') == image_file.name and all(platform in current for platform in wanted):
+        return current
+    names = build_derivatives(image_file, wanted)
+    if current.get('source') == image_file.name:
+        # Same upload: keep derivatives already built for other platforms
+        return {**current, **names}
+    return {'source': image_file.name, **names}
+
+def ensure_post_derivatives(post, platforms=None):
+    """Bring the derivatives of a post's image(s) up to date, saving only what changed"""
+    platforms = platforms or post.platforms
+    media = list(post.media.all())
+    for item in media:
+        derivatives = ensure_derivatives(item.image, item.derivatives, platforms)
+        if derivatives != item.derivatives:
+            item.derivatives = derivatives
+            item.save(update_fields=['derivatives'])
+    if post.image:
+        derivatives = ensure_derivatives(post.image, post.image_derivatives, platforms)
+        if derivatives != post.image_derivatives:
+            post.image_derivatives = derivatives
+            post.save(update_fields=['image_derivatives', 'updated_at'])
@@ -0,0 +1,197 @@
+import json
+import time
+import asyncio
+import logging
+import redis
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'post-events:'
+
+def post_events_channel(user_id):
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+_redis = None
+
+def _get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _redis
+
+def _format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Sent when a client may have missed events and should refetch instead
+RESYNC_EVENT = _format_event('resync', {})
+
+def publish_post_events(events):
+    """
+    Publish (user_id, event, data) tuples to each user's channel once the surrounding
+    transaction commits, so clients never see a change that was rolled back.
+    """
+    events = list(events)
+    if not events:
+        return
+
+    def send():
+        try:
+            pipe = _get_redis().pipeline(transaction=False)
+            for user_id, event, data in events:
+                pipe.publish(post_events_channel(user_id), json.dumps({'event': event, 'data': data}))
+            pipe.execute()
+        except redis.RedisError as e:
+            # Events are best effort; clients resync on reconnect
+            logger.warning(f"Could not publish post events: {str(e)}")
+
+    transaction.on_commit(send)
+
+def publish_post_event(user_id, post_id, status, previous_status=None, fields=None, event='updated'):
+    data = {'post_id': post_id, 'status': status}
+    if previous_status is not None:
+        data['previous_status'] = previous_status
+    if fields:
+        data['fields'] = sorted(fields)
+    publish_post_events([(user_id, event, data)])
+
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Push creations and status transitions; must run before stats.post_saved resets _loaded_stats"""
+    if created:
+        publish_post_event(instance.user_id, instance.pk, instance.status, event='created')
+        return
+    previous = getattr(instance, '_loaded_stats', {}).get('status')
+    if previous is None or previous == instance.status:
+        return
+    fields = set(update_fields or []) - {'updated_at'}
+    publish_post_event(instance.user_id, instance.pk, instance.status, previous, fields)
+
+def post_deleted(sender, instance, **kwargs):
+    publish_post_event(instance.user_id, instance.pk, instance.status, event='deleted')
+
+
+class PostEventHub:
+    """
+    Fans one Redis pattern subscription per process out to every connected client.
+    Each idle connection costs an asyncio queue rather than a Redis connection or a
+    thread, and each message is decoded and formatted once however many tabs a user has.
+    """
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self._subscribers = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=getattr(settings, 'POST_EVENTS_QUEUE_SIZE', 100))
+        self._subscribers[str(user_id)].add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = self.loop.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self._subscribers.get(str(user_id))
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[str(user_id)]
+
+    def connection_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @staticmethod
+    def _deliver(queue, chunk):
+        try:
+            queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            # A client this far behind refetches rather than replaying every delta
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    def _dispatch(self, message):
+        user_id = message['channel'].decode().removeprefix(CHANNEL_PREFIX)
+        queues = self._subscribers.get(user_id)
+        if not queues:
+            return
+        payload = json.loads(message['data'])
+        chunk = _format_event(payload['event'], payload['data'])
+        for queue in queues:
+            self._deliver(queue, chunk)
+
+    def _broadcast(self, chunk):
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._deliver(queue, chunk)
+
+    async def _listen(self):
+        from redis import asyncio as aioredis
+
+        delay = 1
+        while True:
+            client = aioredis.Redis.from_url(settings.CELERY_BROKER_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                delay = 1
+                async for message in pubsub.listen():
+                    self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Post event subscription lost, retrying in {delay}s: {str(e)}")
+                # Anything published while disconnected is gone
+                self._broadcast(RESYNC_EVENT)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+_hub = None
+
+def get_event_hub():
+    global _hub
+    if _hub is None or _hub.loop is not asyncio.get_running_loop():
+        _hub = PostEventHub()
+    return _hub
+
+async def aiter_post_events(user_id, deadline):
+    """
+    Server-Sent Events for one user's posts, served from the process-wide hub (ASGI).
+    Ends at the monotonic deadline so clients reconnect with a fresh token.
+    """
+    keepalive = getattr(settings, 'POST_EVENTS_KEEPALIVE', 15)
+    hub = get_event_hub()
+    queue = hub.subscribe(user_id)
+    try:
+        yield _format_event('ready', {})
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), timeout=min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                # SSE comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield chunk
+    finally:
+        hub.unsubscribe(user_id, queue)
+
+def iter_post_events(user_id, deadline):
+    """Blocking equivalent of aiter_post_events for WSGI servers (one thread per connection)"""
+    keepalive = getattr(settings, 'POST_EVENTS_KEEPALIVE', 15)
+    pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(post_events_channel(user_id))
+    try:
+        yield _format_event('ready', {})
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = pubsub.get_message(timeout=min(keepalive, remaining))
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.loads(message['data'])
+            yield _format_event(payload['event'], payload['data'])
+    finally:
+        pubsub.close()
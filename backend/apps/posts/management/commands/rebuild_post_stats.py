@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.posts.stats import rebuild_post_stats
+
+class Command(BaseCommand):
+    help = 'Recount the per-user dashboard counters from the posts table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_post_stats(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt post stats for {len(rebuilt)} user(s)."))
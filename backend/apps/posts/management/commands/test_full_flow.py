@@ -1,6 +1,11 @@
+from collections import deque
+from unittest import mock
 from django.core.management.base import BaseCommand
 from apps.posts.models import Post
-from apps.posts.tasks import generate_post_text_task, publish_instagram_post
+from apps.posts.tasks import (
+    generate_post_text_task, publish_instagram_post,
+    poll_instagram_container, publish_instagram_container
+)
 from apps.platforms.models import SocialAccount
 from django.contrib.auth.models import User
 import time
@@ -8,6 +13,37 @@ import time
 class Command(BaseCommand):
     help = 'Test full flow: Content Generation -> Instagram Publishing'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--no-cache', action='store_true', help='Bypass cached LLM responses')
+
+    def run_instagram_chain(self, post_id):
+        """
+        Run the container -> poll -> publish chain in this process instead of through
+        the broker. Each follow-up step is queued here and run after its countdown,
+        so polling waits on Meta in real time just as it would on a worker.
+        """
+        chain_tasks = (publish_instagram_post, poll_instagram_container, publish_instagram_container)
+        pending = deque([(publish_instagram_post, (post_id,), 0)])
+
+        def enqueue(task):
+            def apply_async(args=None, kwargs=None, countdown=None, **options):
+                pending.append((task, tuple(args or ()), countdown or 0))
+            return apply_async
+
+        patches = [mock.patch.object(task, 'apply_async', enqueue(task)) for task in chain_tasks]
+        for patch in patches:
+            patch.start()
+        try:
+            while pending:
+                task, task_args, countdown = pending.popleft()
+                if countdown:
+                    self.stdout.write(f"  Waiting {countdown}s before {task.name.rsplit('.', 1)[-1]}...")
+                    time.sleep(countdown)
+                task(*task_args)
+        finally:
+            for patch in patches:
+                patch.stop()
+
     def handle(self, *args, **options):
         # 1. Get the first user
         user = User.objects.first()
@@ -34,7 +70,7 @@ class Command(BaseCommand):
 
         # 4. Generate Text
         self.stdout.write("Step 2: Triggering Ollama AI generation...")
-        generate_post_text_task(post.id) # Call synchronously for test
+        generate_post_text_task(post.id, regenerate=options['no_cache']) # Call synchronously for test
         
         post.refresh_from_db()
         if post.status == 'generated':
@@ -46,7 +82,10 @@ class Command(BaseCommand):
         # 5. Publish to Instagram
         if social_account:
             self.stdout.write("Step 3: Triggering Instagram publishing...")
-            publish_instagram_post(post.id) # Call synchronously
+            try:
+                self.run_instagram_chain(post.id)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Instagram step raised: {str(e)}"))
             
             post.refresh_from_db()
             if post.status == 'posted':
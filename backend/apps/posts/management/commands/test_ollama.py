@@ -6,6 +6,9 @@ from django.contrib.auth.models import User
 class Command(BaseCommand):
     help = 'Test Ollama integration by triggering a post generation task'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--no-cache', action='store_true', help='Bypass cached LLM responses')
+
     def handle(self, *args, **options):
         # 1. Get or create a test user
         user, _ = User.objects.get_or_create(username='testviewer')
@@ -24,7 +27,7 @@ class Command(BaseCommand):
         try:
             # We call the function directly instead of .delay() to see output immediately
             # Note: In a real app, this runs in Celery.
-            generate_post_text_task(post.id)
+            generate_post_text_task(post.id, regenerate=options['no_cache'])
             
             # Refresh from DB
             post.refresh_from_db()
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_base_caption_post_instagram_caption_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='schedule_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
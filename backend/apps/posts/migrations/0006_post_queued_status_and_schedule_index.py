@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_schedule_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('generating', 'Generating'), ('generated', 'Generated'), ('queued', 'Queued'), ('posting', 'Posting'), ('posted', 'Posted'), ('failed', 'Failed')], default='draft', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'scheduled_at'], name='post_status_scheduled_idx'),
+        ),
+    ]
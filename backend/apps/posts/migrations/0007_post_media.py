@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_queued_status_and_schedule_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='post_images/')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media', to='posts.post')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+    ]
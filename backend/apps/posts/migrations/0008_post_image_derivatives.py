@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('generating', 'Generating'), ('generated', 'Generated'), ('queued', 'Queued'), ('posting', 'Posting'), ('posted', 'Posted'), ('partial', 'Partially posted'), ('failed', 'Failed')], default='draft', max_length=20),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from collections import Counter, defaultdict
+from django.db import migrations
+
+
+def backfill_post_counters(apps, schema_editor):
+    """Count existing posts into PostCounter, as the rebuild_post_stats command does"""
+    Post = apps.get_model('posts', 'Post')
+    PostCounter = apps.get_model('posts', 'PostCounter')
+
+    counts = defaultdict(Counter)
+    rows = Post.objects.order_by().values_list('user_id', 'status', 'goal', 'platforms').iterator(chunk_size=2000)
+    for user_id, status, goal, platforms in rows:
+        counts[user_id][('status', status)] += 1
+        if goal:
+            counts[user_id][('goal', goal)] += 1
+        for platform in set(platforms or []):
+            counts[user_id][('platform', platform)] += 1
+
+    PostCounter.objects.all().delete()
+    PostCounter.objects.bulk_create([
+        PostCounter(user_id=user_id, dimension=dimension, key=key, count=count)
+        for user_id, changes in counts.items()
+        for (dimension, key), count in changes.items()
+    ], batch_size=500)
+
+
+def clear_post_counters(apps, schema_editor):
+    apps.get_model('posts', 'PostCounter').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_post_counters, clear_post_counters),
+    ]
@@ -1,13 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
+from common.media import media_url
 
 class Post(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('generating', 'Generating'),
         ('generated', 'Generated'),
+        ('queued', 'Queued'),
         ('posting', 'Posting'),
         ('posted', 'Posted'),
+        ('partial', 'Partially posted'),
         ('failed', 'Failed'),
     )
 
@@ -22,8 +26,12 @@ class Post(models.Model):
     goal = models.CharField(max_length=20, choices=GOAL_CHOICES)
     platforms = models.JSONField(default=list)  # list of platforms: instagram, linkedin, twitter
     image = models.ImageField(upload_to='post_images/', null=True, blank=True)
+    # Platform-conformant copies of image: {'source': image name, platform: storage name}
+    image_derivatives = models.JSONField(default=dict, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     scheduled_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every (re)schedule; queued publishes carrying an older version are ignored
+    schedule_version = models.PositiveIntegerField(default=0)
     
     # Generated Content Fields
     base_caption = models.TextField(blank=True, null=True)
@@ -43,5 +51,152 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the scheduler's due-post claim: status='generated' AND scheduled_at <= now
+            models.Index(fields=['status', 'scheduled_at'], name='post_status_scheduled_idx'),
+            # Backs the cursor-paginated listing: user=... ORDER BY created_at DESC, id DESC
+            models.Index(fields=['user', '-created_at', '-id'], name='post_user_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so stats counters can apply only the difference on save
+        instance._loaded_stats = {
+            name: getattr(instance, name)
+            for name in ('user_id', 'status', 'goal', 'platforms')
+            if name in instance.__dict__
+        }
+        return instance
+
+    def update_outputs(self, mutate, fields=()):
+        """
+        Apply mutate(outputs) to the stored generated_outputs under a row lock and save
+        it together with fields from this instance. Every writer of generated_outputs
+        goes through a lock like this one, so concurrent tasks never drop each other's keys.
+        """
+        with transaction.atomic():
+            locked = Post.objects.select_for_update().only('generated_outputs').get(pk=self.pk)
+            outputs = locked.generated_outputs or {}
+            mutate(outputs)
+            self.generated_outputs = outputs
+            self.save(update_fields=[*fields, 'generated_outputs', 'updated_at'])
+        return outputs
+
+    def merge_output(self, key, **values):
+        """Merge values into generated_outputs[key] under a row lock"""
+        outputs = self.update_outputs(lambda outputs: outputs.setdefault(key, {}).update(values))
+        return outputs[key]
+
+    def caption_for(self, platform):
+        """Generated caption plus hashtags for platform, falling back to the raw content"""
+        caption = getattr(self, f'{platform}_caption', None) or self.content
+        hashtags = getattr(self, f'{platform}_hashtags', None)
+        if hashtags:
+            caption += f"\n\n{hashtags}"
+        return caption
+
+    # Posts on their way out or already out; regenerating them would publish them again
+    PUBLISH_LOCKED_STATUSES = ('queued', 'posting', 'posted', 'partial')
+
+    def has_published(self):
+        """True once any platform has accepted this post"""
+        results = (self.generated_outputs or {}).get('publish', {})
+        return any(result.get('status') == 'posted' for result in results.values())
+
+    def publish_dedupe_key(self, platform):
+        """
+        Identifies one publish generation of this post on platform. Retries share the
+        key and resume from recorded steps; rescheduling starts a new generation.
+        """
+        return f"post-{self.pk}-{platform}-v{self.schedule_version}"
+
+    def record_publish_result(self, platform, outcome):
+        """
+        Store one platform's publish outcome in generated_outputs['publish'] and
+        recompute the post status from all of them, under a row lock.
+        A late 'pending' never overwrites a result the platform already reported.
+        """
+        with transaction.atomic():
+            locked = Post.objects.select_for_update().only('user', 'generated_outputs', 'platforms', 'status').get(pk=self.pk)
+            outputs = locked.generated_outputs or {}
+            results = outputs.setdefault('publish', {})
+            previous = results.get(platform, {}).get('status')
+            if not (outcome.get('status') == 'pending' and previous in ('posted', 'failed')):
+                results[platform] = {**outcome, 'updated_at': timezone.now().isoformat()}
+
+            statuses = [results.get(name, {}).get('status', 'pending') for name in locked.platforms or results]
+            if 'pending' in statuses:
+                status = 'posting'
+            elif all(status == 'posted' for status in statuses):
+                status = 'posted'
+            elif all(status == 'failed' for status in statuses):
+                status = 'failed'
+            else:
+                status = 'partial'
+
+            locked.generated_outputs = outputs
+            locked.status = status
+            locked.save(update_fields=['generated_outputs', 'status', 'updated_at'])
+        self.generated_outputs = outputs
+        self.status = status
+        return status
+
+    def media_items(self):
+        """(image, derivatives) pairs to publish in order: attached PostMedia, else the single image field"""
+        items = [(item.image, item.derivatives) for item in self.media.all()]
+        if not items and self.image:
+            return [(self.image, self.image_derivatives)]
+        return items
+
+    def image_urls(self, platform):
+        """Absolute URLs for platform, preferring the derivative built for it over the original upload"""
+        urls = []
+        for image, derivatives in self.media_items():
+            if derivatives.get('source') == image.name and platform in derivatives:
+                urls.append(media_url(derivatives[platform]))
+            else:
+                urls.append(media_url(image.name))
+        return urls
+
     def __str__(self):
         return f"Post by {self.user.username} - {self.status}"
+
+
+class PostMedia(models.Model):
+    """One image of a multi-image (carousel) post"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='media')
+    image = models.ImageField(upload_to='post_images/')
+    derivatives = models.JSONField(default=dict, blank=True)
+    position = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return f"Media {self.position} of post {self.post_id}"
+
+
+class PostCounter(models.Model):
+    """
+    Incrementally maintained per-user post counts for the dashboard, one row per
+    (dimension, key): e.g. ('status', 'posted'), ('platform', 'instagram'), ('goal', 'hiring').
+    """
+    DIMENSION_CHOICES = (
+        ('status', 'Status'),
+        ('platform', 'Platform'),
+        ('goal', 'Goal'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='post_counters')
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=30)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'dimension', 'key')
+
+    def __str__(self):
+        return f"{self.user_id} {self.dimension}={self.key}: {self.count}"
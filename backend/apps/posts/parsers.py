@@ -0,0 +1,28 @@
+import json
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+def parse_ndjson_lines(lines, encoding='utf-8'):
+    """Decode newline-delimited JSON, one object per non-empty line"""
+    items = []
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode(encoding)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            raise ParseError(f"Invalid JSON on line {number}: {str(e)}")
+    return items
+
+class NDJSONParser(BaseParser):
+    """Parses application/x-ndjson bodies line by line instead of loading one big document"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return parse_ndjson_lines(stream, encoding)
@@ -0,0 +1,120 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from celery import chord, group
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import F, Q
+from .models import Post
+from .stats import record_status_change, update_status
+from .events import publish_post_event, publish_post_events
+from .timing_wheel import get_due_post_queue, use_timing_wheel
+
+logger = logging.getLogger(__name__)
+
+def schedule_publish(post):
+    """
+    Enqueue an exact-time publish for post.scheduled_at, either as a Celery ETA task or,
+    with POST_SCHEDULER_BACKEND='redis', as an entry in the Redis due-post queue.
+    Every call bumps schedule_version, so publishes queued for an earlier time become no-ops.
+    ETA tasks are only sent for posts due within SCHEDULED_POST_ETA_WINDOW: the Redis broker
+    redelivers messages held past its visibility_timeout, so a far-off ETA would run twice.
+    enqueue_upcoming_scheduled_posts sends the rest once they come into range.
+    """
+    from .tasks import publish_scheduled_post
+
+    Post.objects.filter(pk=post.pk).update(schedule_version=F('schedule_version') + 1)
+    post.refresh_from_db(fields=['schedule_version'])
+    ready = post.scheduled_at is not None and post.status == 'generated'
+
+    if use_timing_wheel():
+        queue = get_due_post_queue()
+        if ready:
+            queue.add(post.id, post.schedule_version, post.scheduled_at)
+        else:
+            queue.remove(post.id)
+        return None
+
+    if not ready or post.scheduled_at > timezone.now() + eta_window():
+        return None
+    return publish_scheduled_post.apply_async((post.id, post.schedule_version), eta=post.scheduled_at)
+
+def eta_window():
+    return timedelta(seconds=getattr(settings, 'SCHEDULED_POST_ETA_WINDOW', 1800))
+
+def claim_post_for_publish(post_id, schedule_version=None):
+    """
+    Atomically move a ready post to 'queued'. Only one caller can win the claim,
+    which keeps duplicate ETA deliveries and the reconciliation sweep from double-posting.
+    """
+    posts = Post.objects.filter(pk=post_id, status='generated')
+    if schedule_version is not None:
+        posts = posts.filter(schedule_version=schedule_version)
+    if posts.update(status='queued') != 1:
+        return False
+    user_id = Post.objects.filter(pk=post_id).values_list('user_id', flat=True).first()
+    record_status_change(user_id, 'generated', 'queued')
+    publish_post_event(user_id, post_id, 'queued', 'generated')
+    return True
+
+def claim_due_posts(cutoff, batch_size=100):
+    """
+    Claim posts due at or before cutoff in keyset-paginated batches over
+    (status, scheduled_at). Rows locked by another scheduler replica are skipped,
+    so replicas share the work without claiming the same post twice.
+    Yields lists of (id, platforms) for each claimed batch.
+    """
+    last = None
+    while True:
+        with transaction.atomic():
+            due = Post.objects.select_for_update(skip_locked=True).filter(
+                status='generated',
+                scheduled_at__lte=cutoff
+            )
+            if last is not None:
+                due = due.filter(Q(scheduled_at__gt=last[0]) | Q(scheduled_at=last[0], id__gt=last[1]))
+            batch = list(due.order_by('scheduled_at', 'id').values_list('id', 'scheduled_at', 'platforms', 'user_id')[:batch_size])
+            if not batch:
+                return
+            # The rows are locked by this transaction, so the whole batch is ours
+            Post.objects.filter(id__in=[row[0] for row in batch]).update(status='queued')
+            for user_id, claimed in Counter(row[3] for row in batch).items():
+                record_status_change(user_id, 'generated', 'queued', claimed)
+            publish_post_events(
+                (user_id, 'updated', {'post_id': post_id, 'status': 'queued', 'previous_status': 'generated'})
+                for post_id, _, _, user_id in batch
+            )
+
+        last = (batch[-1][1], batch[-1][0])
+        yield [(post_id, platforms) for post_id, _, platforms, _ in batch]
+
+def publish_post_signature(post_id, platforms):
+    """
+    A chord publishing to every platform in parallel; the callback aggregates
+    the per-platform outcomes, so the post takes as long as its slowest platform.
+    """
+    from .tasks import publish_to_platform, aggregate_publish_results
+
+    return chord(
+        [publish_to_platform.s(post_id, platform) for platform in platforms],
+        aggregate_publish_results.s(post_id)
+    )
+
+def dispatch_platform_publishers(post):
+    if not post.platforms:
+        post.status = 'failed'
+        post.save(update_fields=['status', 'updated_at'])
+        logger.error(f"Post {post.id} has no platforms to publish to")
+        return
+    update_status(Post.objects.filter(pk=post.pk), 'posting')
+    publish_post_signature(post.id, post.platforms).apply_async()
+
+def dispatch_claimed_posts(claimed):
+    """Send the publish chords for a claimed batch as a single Celery group"""
+    signatures = [publish_post_signature(post_id, platforms) for post_id, platforms in claimed if platforms]
+    update_status(Post.objects.filter(id__in=[post_id for post_id, platforms in claimed if platforms]), 'posting')
+    update_status(Post.objects.filter(id__in=[post_id for post_id, platforms in claimed if not platforms]), 'failed')
+    if signatures:
+        group(signatures).apply_async()
+    return len(signatures)
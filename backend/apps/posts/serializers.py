@@ -1,12 +1,119 @@
+from django.conf import settings
+from django.db import models, transaction
 from rest_framework import serializers
-from .models import Post
+from common.media import media_url
+from .models import Post, PostMedia
+from apps.ai_engine.prompt_registry import get_prompt_registry
+
+class SparseFieldsMixin:
+    """
+    Honour a ?fields=id,status,... query parameter by dropping every other field.
+    Unknown names are ignored, so clients can't trigger errors with it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    @staticmethod
+    def requested_fields(request):
+        if request is None or request.method != 'GET':
+            return None
+        fields = request.query_params.get('fields')
+        if not fields:
+            return None
+        return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class MediaImageField(serializers.ImageField):
+    """
+    ImageField whose URL goes through common.media.media_url when MEDIA_SIGNED_URLS
+    is on, since serve_media rejects unsigned requests then.
+    """
+    def to_representation(self, value):
+        if value and getattr(settings, 'MEDIA_SIGNED_URLS', False):
+            return media_url(value.name)
+        return super().to_representation(value)
+
+
+class MediaFieldsMixin:
+    """Build model ImageFields as MediaImageField"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
+
+
+class PostMediaSerializer(MediaFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PostMedia
+        fields = ('id', 'image', 'derivatives', 'position')
+        read_only_fields = fields
+
+
+class PostSerializer(SparseFieldsMixin, MediaFieldsMixin, serializers.ModelSerializer):
+    media = PostMediaSerializer(many=True, read_only=True)
+    # Upload several images to publish the post as a carousel
+    media_files = serializers.ListField(child=serializers.ImageField(), write_only=True, required=False)
 
-class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = '__all__'
-        read_only_fields = ('user', 'status', 'generated_outputs')
+        read_only_fields = ('user', 'status', 'generated_outputs', 'schedule_version', 'image_derivatives')
+
+    def validate_platforms(self, value):
+        if not isinstance(value, list) or not all(isinstance(platform, str) for platform in value):
+            raise serializers.ValidationError("Platforms must be a list of platform names.")
+        supported = get_prompt_registry().available_platforms()
+        unsupported = [platform for platform in value if platform not in supported]
+        if unsupported:
+            raise serializers.ValidationError(
+                f"Unsupported platform(s): {', '.join(unsupported)}. Supported: {', '.join(supported)}."
+            )
+        # Drop duplicates while keeping the requested order
+        return list(dict.fromkeys(value))
+
+    def validate_media_files(self, value):
+        max_items = getattr(settings, 'INSTAGRAM_CAROUSEL_MAX_ITEMS', 10)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"A post can have at most {max_items} images.")
+        return value
+
+    def _save_media(self, post, media_files):
+        PostMedia.objects.bulk_create([
+            PostMedia(post=post, image=image, position=position)
+            for position, image in enumerate(media_files)
+        ])
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        media_files = validated_data.pop('media_files', [])
+        with transaction.atomic():
+            post = super().create(validated_data)
+            self._save_media(post, media_files)
+        return post
+
+    def update(self, instance, validated_data):
+        media_files = validated_data.pop('media_files', None)
+        with transaction.atomic():
+            post = super().update(instance, validated_data)
+            if media_files is not None:
+                # A new upload replaces the whole set
+                post.media.all().delete()
+                self._save_media(post, media_files)
+        return post
+
+
+class PostListSerializer(SparseFieldsMixin, MediaFieldsMixin, serializers.ModelSerializer):
+    """
+    Listing rows without the heavy text columns; PostViewSet defers them in the query
+    and annotates a short excerpt of content instead.
+    """
+    excerpt = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ('id', 'excerpt', 'goal', 'platforms', 'image', 'status', 'scheduled_at', 'created_at', 'updated_at')
+        read_only_fields = fields
@@ -0,0 +1,181 @@
+import json
+import logging
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Post, PostCounter
+from .events import publish_post_events
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_PREFIX = 'post-stats:'
+TRACKED_FIELDS = ('status', 'goal', 'platforms')
+
+_redis = None
+
+def _get_redis():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _redis
+
+def counter_keys(status=None, goal=None, platforms=None):
+    keys = [('status', status)] if status else []
+    if goal:
+        keys.append(('goal', goal))
+    keys.extend(('platform', platform) for platform in set(platforms or []))
+    return keys
+
+def apply_deltas(deltas):
+    """Apply {user_id: Counter({(dimension, key): amount})} to the counters with atomic increments"""
+    touched = []
+    for user_id, changes in deltas.items():
+        for (dimension, key), amount in changes.items():
+            if not amount:
+                continue
+            counters = PostCounter.objects.filter(user_id=user_id, dimension=dimension, key=key)
+            if not counters.update(count=F('count') + amount):
+                PostCounter.objects.get_or_create(user_id=user_id, dimension=dimension, key=key)
+                counters.update(count=F('count') + amount)
+        touched.append(user_id)
+    if touched:
+        transaction.on_commit(lambda: invalidate_cached_stats(*touched))
+
+def update_status(queryset, status):
+    """queryset.update(status=...) that keeps the per-user status counters and event streams in step"""
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().exclude(status=status).values_list('id', 'user_id', 'status'))
+        if not rows:
+            return 0
+        Post.objects.filter(id__in=[row[0] for row in rows]).update(status=status)
+        deltas = defaultdict(Counter)
+        for _, user_id, previous in rows:
+            deltas[user_id][('status', previous)] -= 1
+            deltas[user_id][('status', status)] += 1
+        apply_deltas(deltas)
+        publish_post_events(
+            (user_id, 'updated', {'post_id': post_id, 'status': status, 'previous_status': previous})
+            for post_id, user_id, previous in rows
+        )
+    return len(rows)
+
+def record_status_change(user_id, previous, status, amount=1):
+    apply_deltas({user_id: Counter({('status', previous): -amount, ('status', status): amount})})
+
+def record_created_posts(posts):
+    """Count posts inserted without save() signals, e.g. by bulk_create"""
+    deltas = defaultdict(Counter)
+    for post in posts:
+        for key in counter_keys(post.status, post.goal, post.platforms):
+            deltas[post.user_id][key] += 1
+    apply_deltas(deltas)
+
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        current = {name: getattr(instance, name) for name in TRACKED_FIELDS}
+        apply_deltas({instance.user_id: Counter(dict.fromkeys(counter_keys(**current), 1))})
+        instance._loaded_stats = {'user_id': instance.user_id, **current}
+        return
+
+    loaded = getattr(instance, '_loaded_stats', None)
+    if loaded is None or (update_fields is not None and not set(update_fields) & set(TRACKED_FIELDS)):
+        return
+    # Only fields present on the instance can have been written; reading a deferred
+    # one would cost a query (and it is unchanged, so it cancels out of the delta anyway)
+    names = [
+        name for name in TRACKED_FIELDS
+        if name in instance.__dict__ and (update_fields is None or name in update_fields)
+    ]
+    current = {name: getattr(instance, name) for name in names}
+    # Fields that weren't loaded before are treated as unchanged
+    previous = {name: loaded.get(name, current[name]) for name in names}
+    if previous == current:
+        return
+    changes = Counter()
+    for key in counter_keys(**previous):
+        changes[key] -= 1
+    for key in counter_keys(**current):
+        changes[key] += 1
+    apply_deltas({loaded.get('user_id', instance.user_id): changes})
+    instance._loaded_stats = {**loaded, **current}
+
+def post_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_stats', None) or {}
+    values = {name: loaded.get(name, getattr(instance, name)) for name in TRACKED_FIELDS}
+    apply_deltas({instance.user_id: Counter(dict.fromkeys(counter_keys(**values), -1))})
+
+def invalidate_cached_stats(*user_ids):
+    try:
+        _get_redis().delete(*[f"{STATS_CACHE_PREFIX}{user_id}" for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached post stats: {str(e)}")
+
+def get_counter_summary(user_id):
+    """Counts by status, platform and goal; served from Redis when cached"""
+    key = f"{STATS_CACHE_PREFIX}{user_id}"
+    try:
+        cached = _get_redis().get(key)
+        if cached:
+            return json.loads(cached)
+    except Exception as e:
+        logger.warning(f"Could not read cached post stats: {str(e)}")
+
+    summary = {'by_status': {}, 'by_platform': {}, 'by_goal': {}}
+    for dimension, counter_key, count in PostCounter.objects.filter(user_id=user_id).values_list('dimension', 'key', 'count'):
+        if count:
+            summary[f"by_{dimension}"][counter_key] = count
+    summary['total'] = sum(summary['by_status'].values())
+
+    try:
+        _get_redis().set(key, json.dumps(summary), ex=getattr(settings, 'POST_STATS_CACHE_TTL', 300))
+    except Exception as e:
+        logger.warning(f"Could not cache post stats: {str(e)}")
+    return summary
+
+def get_post_stats(user):
+    """Dashboard summary: cached counters plus the next few scheduled posts"""
+    stats = get_counter_summary(user.id)
+    upcoming = Post.objects.filter(
+        user=user,
+        status__in=['generated', 'queued'],
+        scheduled_at__gte=timezone.now()
+    ).order_by('scheduled_at')
+    limit = getattr(settings, 'POST_STATS_UPCOMING_LIMIT', 5)
+    # Bounded by posts still waiting to go out, not by history size
+    stats['upcoming_count'] = upcoming.count()
+    stats['upcoming'] = [
+        {'id': post_id, 'scheduled_at': scheduled_at, 'status': status, 'platforms': platforms}
+        for post_id, scheduled_at, status, platforms in upcoming.values_list('id', 'scheduled_at', 'status', 'platforms')[:limit]
+    ]
+    return stats
+
+def rebuild_post_stats(user_ids=None, chunk_size=2000):
+    """Recount every counter from the posts table (repair path); returns the users rebuilt"""
+    posts = Post.objects.all()
+    if user_ids is not None:
+        posts = posts.filter(user_id__in=user_ids)
+
+    counts = defaultdict(Counter)
+    rows = posts.order_by().values_list('user_id', 'status', 'goal', 'platforms').iterator(chunk_size=chunk_size)
+    for user_id, status, goal, platforms in rows:
+        for key in counter_keys(status, goal, platforms):
+            counts[user_id][key] += 1
+
+    with transaction.atomic():
+        counters = PostCounter.objects.all()
+        if user_ids is not None:
+            counters = counters.filter(user_id__in=user_ids)
+        counters.delete()
+        PostCounter.objects.bulk_create([
+            PostCounter(user_id=user_id, dimension=dimension, key=key, count=count)
+            for user_id, changes in counts.items()
+            for (dimension, key), count in changes.items()
+        ], batch_size=500)
+
+    rebuilt = set(counts) | set(user_ids or [])
+    if rebuilt:
+        invalidate_cached_stats(*rebuilt)
+    return rebuilt
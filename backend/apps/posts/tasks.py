@@ -1,112 +1,467 @@
+import math
 import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from celery import shared_task
 from .models import Post
 from apps.ai_engine.services import PostGenerationService
+from apps.ai_engine.streaming import CaptionStreamPublisher
+from apps.ai_engine.concurrency import LLMCapacityError
+from .scheduling import (
+    schedule_publish, claim_post_for_publish, claim_due_posts,
+    dispatch_platform_publishers, dispatch_claimed_posts, eta_window
+)
+from .timing_wheel import get_due_post_queue
+from .derivatives import ensure_post_derivatives
 from django.conf import settings
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, max_retries=3)
-def generate_post_text_task(self, post_id):
+def generate_post_text_task(self, post_id, regenerate=False):
     try:
         post = Post.objects.get(id=post_id)
         post.status = 'generating'
-        post.save()
+        post.save(update_fields=['status', 'updated_at'])
         
-        service = PostGenerationService()
+        # regenerate=True bypasses the LLM response cache so the user gets fresh text
+        service = PostGenerationService(use_cache=not regenerate, resume=not regenerate)
         # The service now saves the content and sets status to 'generated'
         service.generate_all_platform_text(post)
+
+        # A post any platform already accepted is never rescheduled: the new schedule_version
+        # would give it a fresh dedupe key and publish it a second time
+        if post.scheduled_at and not post.has_published():
+            # Publish at exactly scheduled_at (immediately if it has already passed)
+            schedule_publish(post)
         
         return f"Post {post_id} text generated successfully"
         
     except Post.DoesNotExist:
         logger.error(f"Post {post_id} not found")
         return
+    except LLMCapacityError as exc:
+        # Model server is saturated: back off and try again without failing the post
+        # Re-enqueue rather than retry so waiting for capacity doesn't use up max_retries
+        logger.warning(f"LLM capacity reached for post {post_id}, requeueing: {str(exc)}")
+        # Checkpoints from this attempt are kept, so the requeued run always resumes
+        generate_post_text_task.apply_async((post_id,), countdown=30)
+        return
     except Exception as exc:
         logger.error(f"Error generating text for post {post_id}: {str(exc)}")
         if self.request.retries >= self.max_retries:
             post.status = 'failed'
-            post.save()
-        raise self.retry(exc=exc, countdown=60)
+            post.save(update_fields=['status', 'updated_at'])
+            if getattr(settings, 'AI_STREAMING_ENABLED', True):
+                CaptionStreamPublisher(post_id).complete(post.status)
+        # Retries resume from the last checkpoint instead of starting over
+        raise self.retry(exc=exc, countdown=60, kwargs={'regenerate': False})
+
 @shared_task(bind=True, max_retries=3)
-def publish_instagram_post(self, post_id):
+def build_post_derivatives(self, post_id):
+    """Build platform-conformant copies of a post's images at upload time"""
+    try:
+        post = Post.objects.get(id=post_id)
+        ensure_post_derivatives(post)
+    except Post.DoesNotExist:
+        return
+    except Exception as exc:
+        logger.error(f"Error building image derivatives for post {post_id}: {str(exc)}")
+        raise self.retry(exc=exc, countdown=30)
+
+def _get_instagram_account(post):
     from apps.platforms.models import SocialAccount
+    return SocialAccount.objects.filter(user=post.user, platform='instagram').first()
+
+def _instagram_state(post):
+    """
+    Recorded Graph steps for the current publish generation. State left by an
+    earlier generation (a different dedupe key) is discarded so it's never reused.
+    """
+    key = post.publish_dedupe_key('instagram')
+    state = post.generated_outputs.get('instagram', {})
+    if state.get('dedupe_key') != key:
+        state = post.merge_output(
+            'instagram',
+            dedupe_key=key, container_id=None, children={},
+            publish_started_at=None, publish_id=None, error=None
+        )
+    return state
+
+def _confirm_instagram_published(post, publish_id):
+    post.record_publish_result('instagram', {
+        'status': 'posted',
+        'id': publish_id,
+        'dedupe_key': post.publish_dedupe_key('instagram')
+    })
+
+def _fail_instagram_post(post, message):
+    post.merge_output('instagram', error=message)
+    post.record_publish_result('instagram', {'status': 'failed', 'error': message})
+    logger.error(f"Failed to publish post {post.id} to Instagram: {message}")
+
+def _create_carousel_children(post, social_account, image_urls):
+    """
+    Create all carousel child containers concurrently, so the batch takes about as
+    long as the slowest upload. Children created by earlier attempts are reused,
+    so a retry after a partial failure only re-creates the ones that failed.
+    """
+    from apps.platforms.services.instagram import InstagramService
+
+    created = dict(post.generated_outputs.get('instagram', {}).get('children', {}))
+    missing = [index for index in range(len(image_urls)) if str(index) not in created]
+    errors = []
+    if missing:
+        workers = max(1, min(getattr(settings, 'INSTAGRAM_CAROUSEL_MAX_WORKERS', 10), len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    InstagramService.create_media_container,
+                    social_account.external_user_id,
+                    social_account.access_token,
+                    image_urls[index],
+                    None,
+                    True
+                ): index
+                for index in missing
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    created[str(index)] = future.result()
+                except Exception as e:
+                    logger.error(f"Carousel item {index} of post {post.id} failed: {str(e)}")
+                    errors.append(str(e))
+                    continue
+                # Saved as each one lands, so a worker crash mid-batch loses none of them
+                post.merge_output('instagram', children=dict(created))
+
+    if errors:
+        raise Exception(f"{len(errors)} of {len(image_urls)} carousel items failed: {errors[0]}")
+    return [created[str(index)] for index in range(len(image_urls))]
+
+@shared_task(bind=True, max_retries=3)
+def publish_instagram_post(self, post_id):
+    """
+    Step 1 of the Instagram chain: create (or reuse) the media container, then hand
+    off to poll_instagram_container. No step ever sleeps inside a worker.
+    """
     from apps.platforms.services.instagram import InstagramService
+    from apps.platforms.services.graph_client import get_graph_client
     
     try:
         post = Post.objects.get(id=post_id)
-        social_account = SocialAccount.objects.filter(user=post.user, platform='instagram').first()
+        social_account = _get_instagram_account(post)
         
         if not social_account:
-            post.status = 'failed'
-            post.save()
-            logger.error(f"No Instagram account connected for user {post.user.username}")
+            _fail_instagram_post(post, f"No Instagram account connected for user {post.user.username}")
             return
+
+        # Back off while Meta reports high usage instead of failing on throttling errors
+        wait = get_graph_client().throttle.delay()
+        if wait > 0:
+            publish_instagram_post.apply_async((post_id,), countdown=math.ceil(wait))
+            return
+
+        state = _instagram_state(post)
+        if state.get('publish_id') or state.get('publish_started_at'):
+            # Already published (or possibly so) in this generation: never create a new container
+            poll_instagram_container.delay(post_id, 0)
+            return
+
+        # A container persisted by an earlier attempt is reused instead of creating a new one
+        container_id = state.get('container_id')
+        if not container_id:
+            # 1. Get Instagram specific content
+            caption = post.caption_for('instagram')
             
-        post.status = 'posting'
-        post.save()
-        
-        # 1. Get Instagram specific content
-        caption = post.instagram_caption or post.content
-        if post.instagram_hashtags:
-            caption += f"\n\n{post.instagram_hashtags}"
-        
-        # For Instagram, we need an image URL. 
-        # In a real app, this would be a public URL. 
-        # For testing, we'll use a placeholder or the actual image URL if available.
-        if not post.image:
-            raise Exception("No image found for the post. Instagram requires an image.")
+            # For Instagram, we need an image URL. 
+            # In a real app, this would be a public URL. 
+            # For testing, we'll use a placeholder or the actual image URL if available.
+            if not post.media_items():
+                raise Exception("No image found for the post. Instagram requires an image.")
+
+            # Publish the resized/re-encoded copies; building them here is a no-op once cached
+            ensure_post_derivatives(post, ['instagram'])
+            image_urls = post.image_urls('instagram')
             
-        image_url = settings.SITE_URL + post.image.url
-        
-        # 2. Create media container
-        creation_id = InstagramService.create_media_container(
-            social_account.external_user_id,
-            social_account.access_token,
-            image_url,
-            caption
+            # 2. Create media container
+            if len(image_urls) == 1:
+                container_id = InstagramService.create_media_container(
+                    social_account.external_user_id,
+                    social_account.access_token,
+                    image_urls[0],
+                    caption
+                )
+            else:
+                children = _create_carousel_children(post, social_account, image_urls)
+                container_id = InstagramService.create_carousel_container(
+                    social_account.external_user_id,
+                    social_account.access_token,
+                    children,
+                    caption
+                )
+            post.merge_output('instagram', container_id=container_id)
+
+        # 3. Wait for Meta to finish processing the container
+        poll_instagram_container.apply_async(
+            (post_id, 0),
+            countdown=getattr(settings, 'INSTAGRAM_CONTAINER_POLL_INITIAL', 2)
         )
         
-        # 3. Publish container
+    except Post.DoesNotExist:
+        return
+    except Exception as exc:
+        logger.error(f"Failed to publish to Instagram: {str(exc)}")
+        if self.request.retries >= self.max_retries:
+            _fail_instagram_post(post, str(exc))
+        raise self.retry(exc=exc, countdown=300)
+
+@shared_task(bind=True, max_retries=5)
+def poll_instagram_container(self, post_id, attempt):
+    """Step 2: check the container's status_code, re-scheduling itself with backoff until FINISHED"""
+    from apps.platforms.services.instagram import InstagramService
+
+    try:
+        post = Post.objects.get(id=post_id)
+        container_id = post.generated_outputs.get('instagram', {}).get('container_id')
+        social_account = _get_instagram_account(post)
+        if not container_id or not social_account:
+            _fail_instagram_post(post, "Missing media container or Instagram account")
+            return
+
+        status_code = InstagramService.get_container_status(container_id, social_account.access_token)
+    except Post.DoesNotExist:
+        return
+    except Exception as exc:
+        logger.warning(f"Could not read container status for post {post_id}: {str(exc)}")
+        if self.request.retries >= self.max_retries:
+            _fail_instagram_post(post, f"Could not read media container status: {str(exc)}")
+        raise self.retry(exc=exc, countdown=30)
+
+    post.merge_output('instagram', container_status=status_code)
+    if status_code == 'PUBLISHED':
+        # An earlier attempt already published this container; don't publish twice
+        _confirm_instagram_published(post, post.generated_outputs['instagram'].get('publish_id'))
+    elif status_code == 'FINISHED':
+        publish_instagram_container.delay(post_id)
+    elif status_code == 'IN_PROGRESS':
+        max_attempts = getattr(settings, 'INSTAGRAM_CONTAINER_POLL_MAX_ATTEMPTS', 12)
+        if attempt + 1 >= max_attempts:
+            _fail_instagram_post(post, f"Media container {container_id} still IN_PROGRESS after {max_attempts} checks")
+            return
+        countdown = min(
+            getattr(settings, 'INSTAGRAM_CONTAINER_POLL_INITIAL', 2) * 2 ** (attempt + 1),
+            getattr(settings, 'INSTAGRAM_CONTAINER_POLL_MAX_DELAY', 60)
+        )
+        poll_instagram_container.apply_async((post_id, attempt + 1), countdown=countdown)
+    elif status_code == 'EXPIRED':
+        # Containers expire after 24h; start over with fresh ones
+        post.merge_output('instagram', container_id=None, children={})
+        publish_instagram_post.delay(post_id)
+    else:
+        _fail_instagram_post(post, f"Media container {container_id} reported {status_code}")
+
+@shared_task(bind=True, max_retries=3)
+def publish_instagram_container(self, post_id):
+    """Step 3: publish the finished container, respecting Meta's publishing caps"""
+    from apps.platforms.services.instagram import InstagramService
+    from apps.platforms.rate_limit import reserve_instagram_publish
+
+    try:
+        post = Post.objects.get(id=post_id)
+        social_account = _get_instagram_account(post)
+        state = _instagram_state(post)
+        container_id = state.get('container_id')
+        if state.get('publish_id'):
+            # Confirmed by an earlier attempt; only the bookkeeping is repeated
+            _confirm_instagram_published(post, state['publish_id'])
+            return
+        if not container_id or not social_account:
+            _fail_instagram_post(post, "Missing media container or Instagram account")
+            return
+
+        if state.get('publish_started_at'):
+            # An earlier attempt may have published before failing; ask Meta before trying again
+            if InstagramService.get_container_status(container_id, social_account.access_token) == 'PUBLISHED':
+                _confirm_instagram_published(post, None)
+                return
+
+        # Wait for a token under the publishing caps instead of failing on throttling errors
+        wait = reserve_instagram_publish(social_account)
+        if wait > 0:
+            countdown = math.ceil(wait)
+            logger.info(f"Instagram publish limit reached for post {post_id}, deferring {countdown}s")
+            publish_instagram_container.apply_async((post_id,), countdown=countdown)
+            return
+
+        # Record the intent first, so a retry after an ambiguous failure checks before republishing
+        post.merge_output('instagram', publish_started_at=timezone.now().isoformat())
         publish_id = InstagramService.publish_media(
             social_account.external_user_id,
             social_account.access_token,
-            creation_id
+            container_id
         )
-        
-        post.status = 'posted'
+
         # Store Meta response ID
-        post.generated_outputs['instagram']['publish_id'] = publish_id
-        post.save()
-        
+        post.merge_output('instagram', publish_id=publish_id)
+        _confirm_instagram_published(post, publish_id)
+
     except Post.DoesNotExist:
         return
     except Exception as exc:
-        post.status = 'failed'
-        post.save()
         logger.error(f"Failed to publish to Instagram: {str(exc)}")
-        raise self.retry(exc=exc, countdown=300)
+        if self.request.retries >= self.max_retries:
+            _fail_instagram_post(post, str(exc))
+        raise self.retry(exc=exc, countdown=60)
+
+@shared_task(bind=True, max_retries=3)
+def publish_to_platform(self, post_id, platform):
+    """
+    Chord member: publish a post to one platform through its registered adapter.
+    Always returns an outcome dict so one failing platform can't block the callback.
+    """
+    from apps.platforms.publishers import get_publisher
+    from apps.platforms.services.graph_client import AmbiguousWriteError
+
+    publisher = get_publisher(platform)
+    if publisher is None:
+        return {'platform': platform, 'status': 'failed', 'error': f"No publisher registered for {platform}"}
+
+    try:
+        post = Post.objects.get(id=post_id)
+    except Post.DoesNotExist:
+        return {'platform': platform, 'status': 'failed', 'error': 'Post not found'}
+
+    dedupe_key = post.publish_dedupe_key(platform)
+    previous = post.generated_outputs.get('publish', {}).get(platform, {})
+    if previous.get('dedupe_key') == dedupe_key and previous.get('status') == 'posted':
+        # This generation is already live; a redelivered task must not post it again
+        return {'platform': platform, **previous}
+
+    account = publisher.get_account(post)
+    if not account:
+        return {'platform': platform, 'status': 'failed', 'error': f"No {platform} account connected"}
+
+    try:
+        outcome = publisher.publish(post, account)
+    except (requests.exceptions.ReadTimeout, AmbiguousWriteError) as exc:
+        # The platform may have accepted the post before failing; retrying could duplicate it
+        logger.error(f"Ambiguous failure publishing post {post_id} to {platform}: {str(exc)}")
+        return {'platform': platform, 'status': 'failed', 'dedupe_key': dedupe_key,
+                'error': f"No answer from {platform}; the post may be live, not retried"}
+    except Exception as exc:
+        logger.error(f"Failed to publish post {post_id} to {platform}: {str(exc)}")
+        if self.request.retries >= self.max_retries:
+            return {'platform': platform, 'status': 'failed', 'error': str(exc)}
+        raise self.retry(exc=exc, countdown=60)
+
+    outcome = {**outcome, 'dedupe_key': dedupe_key}
+    if outcome['status'] == 'posted':
+        # Confirm right away rather than only in the chord callback
+        post.record_publish_result(platform, outcome)
+    return {'platform': platform, **outcome}
+
+@shared_task
+def aggregate_publish_results(results, post_id):
+    """Chord callback: record every platform's outcome and the resulting post status"""
+    try:
+        post = Post.objects.get(id=post_id)
+    except Post.DoesNotExist:
+        return
+    status = post.status
+    for result in results:
+        outcome = dict(result)
+        platform = outcome.pop('platform')
+        status = post.record_publish_result(platform, outcome)
+    logger.info(f"Post {post_id} publish results: {status}")
+    return status
+
+@shared_task
+def publish_scheduled_post(post_id, schedule_version):
+    """ETA task enqueued for scheduled_at; a stale version or an already claimed post is a no-op"""
+    if not claim_post_for_publish(post_id, schedule_version):
+        logger.info(f"Skipping scheduled publish for post {post_id} (rescheduled or already claimed)")
+        return
+
+    post = Post.objects.get(id=post_id)
+    dispatch_platform_publishers(post)
 
 @shared_task
 def check_and_publish_scheduled_posts():
+    """Reconciliation sweep for due posts whose ETA publish was lost or never enqueued"""
     from django.utils import timezone
-    from .models import Post
-    
+    from datetime import timedelta
+
     now = timezone.now()
-    # Get posts that are due and have 'generated' status (ready to be posted)
-    scheduled_posts = Post.objects.filter(
-        scheduled_at__lte=now,
-        status='generated'
-    )
-    
-    logger.info(f"Checking for scheduled posts at {now}. Found {scheduled_posts.count()} due posts.")
-    
-    for post in scheduled_posts:
-        # Trigger individual platform publishing tasks
-        # For now we only have Instagram
-        if 'instagram' in post.platforms:
-            publish_instagram_post.delay(post.id)
-            
-        # You can add logic for other platforms here as they are implemented
-        # post.status = 'posting' (optional, maybe individual tasks should handle this)
-        # post.save()
+    # Leave a grace period so on-time ETA tasks win the claim
+    grace = timedelta(seconds=getattr(settings, 'SCHEDULED_POST_GRACE_SECONDS', 60))
+    batch_size = getattr(settings, 'SCHEDULED_POST_BATCH_SIZE', 100)
+
+    claimed = 0
+    for batch in claim_due_posts(now - grace, batch_size):
+        dispatch_claimed_posts(batch)
+        claimed += len(batch)
+
+    if claimed:
+        logger.warning(f"Reconciliation sweep at {now} dispatched {claimed} missed scheduled post(s).")
+
+@shared_task
+def enqueue_upcoming_scheduled_posts():
+    """
+    Send ETA publishes for posts that have come within SCHEDULED_POST_ETA_WINDOW since
+    they were scheduled. Each run covers the last two intervals of the window, so one
+    late beat doesn't drop a post; a post enqueued twice is still claimed only once.
+    """
+    from celery import group
+    from datetime import timedelta
+
+    now = timezone.now()
+    window_end = now + eta_window()
+    interval = timedelta(seconds=getattr(settings, 'SCHEDULED_POST_HANDOFF_INTERVAL', 600))
+    upcoming = Post.objects.filter(
+        status='generated',
+        scheduled_at__gt=max(now, window_end - 2 * interval),
+        scheduled_at__lte=window_end
+    ).values_list('id', 'schedule_version', 'scheduled_at')
+
+    signatures = [
+        publish_scheduled_post.signature((post_id, version), eta=scheduled_at)
+        for post_id, version, scheduled_at in upcoming.iterator(chunk_size=1000)
+    ]
+    if signatures:
+        group(signatures).apply_async()
+    return len(signatures)
+
+@shared_task
+def dispatch_due_posts():
+    """Pop due entries from the Redis due-post queue and hand them to the publish tasks"""
+    from celery import group
+    from django.utils import timezone
+
+    queue = get_due_post_queue()
+    batch_size = getattr(settings, 'SCHEDULED_POST_BATCH_SIZE', 100)
+    now = timezone.now()
+    dispatched = 0
+    while True:
+        due = queue.pop_due(now, batch_size)
+        if not due:
+            break
+        # No database reads here; publish_scheduled_post claims each post itself
+        group(publish_scheduled_post.s(post_id, version) for post_id, version in due).apply_async()
+        dispatched += len(due)
+        if len(due) < batch_size:
+            break
+    return dispatched
+
+@shared_task
+def rebuild_due_post_queue():
+    """Resync the Redis due-post queue from the database, the source of truth"""
+    entries = Post.objects.filter(
+        status='generated',
+        scheduled_at__isnull=False
+    ).values_list('id', 'schedule_version', 'scheduled_at').iterator(chunk_size=1000)
+    count = get_due_post_queue().rebuild(entries)
+    logger.info(f"Rebuilt due-post queue with {count} scheduled post(s).")
+    return count
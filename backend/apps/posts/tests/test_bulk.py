@@ -0,0 +1,78 @@
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.posts.models import Post, PostCounter
+from apps.posts.views import PostViewSet
+
+@override_settings(POSTS_BULK_MAX_ITEMS=5, POSTS_BULK_CHUNK_SIZE=2)
+@mock.patch('apps.posts.stats._get_redis', return_value=mock.Mock(**{'get.return_value': None}))
+@mock.patch('apps.posts.views.group')
+class BulkCreateTests(TestCase):
+    url = '/api/posts/bulk/'
+
+    def setUp(self):
+        self.user = User.objects.create_user('bulk', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def items(self, count):
+        return [{'content': f"Post {index}", 'goal': 'promotion', 'platforms': ['linkedin']} for index in range(count)]
+
+    def dispatched_ids(self, group):
+        return [signature.args[0] for call in group.call_args_list for signature in call[0][0]]
+
+    def assertCreated(self, response, group, indexes):
+        self.assertEqual(response.status_code, 201)
+        created = response.json()['created']
+        self.assertEqual([item['index'] for item in created], indexes)
+        ids = [item['id'] for item in created]
+        posts = Post.objects.filter(user=self.user).in_bulk(ids)
+        for index, post_id in zip(indexes, ids):
+            self.assertEqual(posts[post_id].content, f"Post {index}")
+            self.assertEqual(posts[post_id].status, 'generating')
+            self.assertEqual(posts[post_id].generated_outputs, {})
+        self.assertEqual(self.dispatched_ids(group), ids)
+        counter = PostCounter.objects.get(user=self.user, dimension='status', key='generating')
+        self.assertEqual(counter.count, len(indexes))
+
+    def test_json_list_with_invalid_rows(self, group, _redis):
+        items = self.items(4)
+        items[1]['goal'] = 'unknown'
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertCreated(response, group, [0, 2, 3])
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1])
+        # Chunks of POSTS_BULK_CHUNK_SIZE
+        self.assertEqual(group.call_count, 2)
+
+    def test_ndjson_body(self, group, _redis):
+        body = '\n'.join(json.dumps(item) for item in self.items(3))
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertCreated(response, group, [0, 1, 2])
+
+    def test_backend_without_returning_bulk_inserts(self, group, _redis):
+        # Another user's concurrent bulk insert must not be mixed into this one
+        Post.objects.create(user=User.objects.create_user('other'), content='Other', goal='promotion', platforms=[])
+        features = type(connection.features)
+        fallback = mock.patch.object(
+            PostViewSet, '_bulk_create_without_returning', wraps=PostViewSet._bulk_create_without_returning
+        )
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False), fallback as bulk_create:
+            response = self.client.post(self.url, self.items(3), format='json')
+        bulk_create.assert_called_once()
+        self.assertCreated(response, group, [0, 1, 2])
+
+    def test_too_many_items(self, group, _redis):
+        response = self.client.post(self.url, self.items(6), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+        group.assert_not_called()
+
+    def test_all_rows_invalid(self, group, _redis):
+        response = self.client.post(self.url, [{'content': 'No goal'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], [])
+        group.assert_not_called()
@@ -0,0 +1,56 @@
+from unittest import mock
+import requests
+from django.contrib.auth.models import User
+from django.test import TestCase
+from apps.posts.models import Post
+from apps.posts.tasks import publish_to_platform
+from apps.platforms.services.graph_client import AmbiguousWriteError
+
+class PublishToPlatformTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('publisher', password='pass')
+        self.post = Post.objects.create(
+            user=self.user, content='Launch', goal='announcement',
+            platforms=['linkedin'], status='posting', schedule_version=3
+        )
+        self.publisher = mock.Mock()
+        patcher = mock.patch('apps.platforms.publishers.get_publisher', return_value=self.publisher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_posted_generation_is_not_published_again(self):
+        dedupe_key = self.post.publish_dedupe_key('linkedin')
+        self.post.record_publish_result('linkedin', {'status': 'posted', 'id': 'urn:1', 'dedupe_key': dedupe_key})
+
+        result = publish_to_platform(self.post.id, 'linkedin')
+
+        self.publisher.publish.assert_not_called()
+        self.assertEqual(result['status'], 'posted')
+        self.assertEqual(result['id'], 'urn:1')
+
+    def test_rescheduled_post_is_a_new_generation(self):
+        self.post.record_publish_result('linkedin', {'status': 'posted', 'id': 'urn:1', 'dedupe_key': 'post-1-linkedin-v2'})
+        self.publisher.publish.return_value = {'status': 'posted', 'id': 'urn:2'}
+
+        result = publish_to_platform(self.post.id, 'linkedin')
+
+        self.publisher.publish.assert_called_once()
+        self.assertEqual(result['dedupe_key'], self.post.publish_dedupe_key('linkedin'))
+        stored = Post.objects.get(id=self.post.id).generated_outputs['publish']['linkedin']
+        self.assertEqual(stored['id'], 'urn:2')
+
+    def test_ambiguous_failures_fail_without_retrying(self):
+        for exc in (requests.exceptions.ReadTimeout('slow'), AmbiguousWriteError('503')):
+            self.publisher.publish.side_effect = exc
+            with mock.patch.object(publish_to_platform, 'retry') as retry:
+                result = publish_to_platform(self.post.id, 'linkedin')
+            retry.assert_not_called()
+            self.assertEqual(result['status'], 'failed')
+            self.assertEqual(result['dedupe_key'], self.post.publish_dedupe_key('linkedin'))
+
+    def test_other_errors_are_retried(self):
+        self.publisher.publish.side_effect = Exception('Token expired')
+        with mock.patch.object(publish_to_platform, 'retry', side_effect=RuntimeError('retry')) as retry:
+            with self.assertRaises(RuntimeError):
+                publish_to_platform(self.post.id, 'linkedin')
+        retry.assert_called_once()
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps.posts.models import Post
+from apps.posts.scheduling import schedule_publish, claim_post_for_publish
+from apps.posts.tasks import publish_scheduled_post, enqueue_upcoming_scheduled_posts
+
+@override_settings(POST_SCHEDULER_BACKEND='eta', SCHEDULED_POST_ETA_WINDOW=1800, SCHEDULED_POST_HANDOFF_INTERVAL=600)
+class SchedulePublishTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('scheduler', password='pass')
+
+    def make_post(self, delay, status='generated'):
+        return Post.objects.create(
+            user=self.user, content='Launch', goal='announcement', platforms=['linkedin'],
+            status=status, scheduled_at=timezone.now() + delay
+        )
+
+    @mock.patch.object(publish_scheduled_post, 'apply_async')
+    def test_enqueues_eta_for_posts_due_within_window(self, apply_async):
+        post = self.make_post(timedelta(minutes=10))
+        schedule_publish(post)
+        apply_async.assert_called_once_with((post.id, 1), eta=post.scheduled_at)
+
+    @mock.patch.object(publish_scheduled_post, 'apply_async')
+    def test_leaves_far_off_posts_to_the_handoff(self, apply_async):
+        post = self.make_post(timedelta(days=3))
+        self.assertIsNone(schedule_publish(post))
+        apply_async.assert_not_called()
+        # The version still moves on, so a publish queued for an earlier time is void
+        self.assertEqual(Post.objects.get(id=post.id).schedule_version, 1)
+
+    @mock.patch('celery.group')
+    def test_handoff_enqueues_posts_entering_the_window(self, group):
+        entering = self.make_post(timedelta(minutes=25))
+        self.make_post(timedelta(minutes=5))
+        self.make_post(timedelta(days=3))
+        self.make_post(timedelta(minutes=25), status='draft')
+
+        self.assertEqual(enqueue_upcoming_scheduled_posts(), 1)
+        signatures = list(group.call_args[0][0])
+        self.assertEqual(signatures[0].args, (entering.id, 0))
+        self.assertEqual(signatures[0].options['eta'], entering.scheduled_at)
+
+
+class ClaimPostForPublishTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('claimer', password='pass')
+        self.post = Post.objects.create(
+            user=self.user, content='Launch', goal='announcement', platforms=['linkedin'],
+            status='generated', scheduled_at=timezone.now(), schedule_version=2
+        )
+
+    def test_only_the_first_claim_wins(self):
+        self.assertTrue(claim_post_for_publish(self.post.id, 2))
+        self.assertFalse(claim_post_for_publish(self.post.id, 2))
+        self.assertFalse(claim_post_for_publish(self.post.id))
+        self.assertEqual(Post.objects.get(id=self.post.id).status, 'queued')
+
+    def test_stale_schedule_version_is_a_no_op(self):
+        self.assertFalse(claim_post_for_publish(self.post.id, 1))
+        self.assertEqual(Post.objects.get(id=self.post.id).status, 'generated')
+
+    @mock.patch('apps.posts.tasks.dispatch_platform_publishers')
+    def test_duplicate_eta_delivery_dispatches_once(self, dispatch):
+        publish_scheduled_post(self.post.id, 2)
+        publish_scheduled_post(self.post.id, 2)
+        dispatch.assert_called_once()
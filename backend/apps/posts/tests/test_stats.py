@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from apps.posts.models import Post, PostCounter
+from apps.posts.stats import get_post_stats, rebuild_post_stats, record_created_posts, update_status
+
+@mock.patch('apps.posts.stats._get_redis', return_value=mock.Mock(**{'get.return_value': None}))
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('counter', password='pass')
+
+    def counts(self):
+        return {
+            (dimension, key): count
+            for dimension, key, count in PostCounter.objects.filter(user=self.user).values_list('dimension', 'key', 'count')
+            if count
+        }
+
+    def assertMatchesRebuild(self):
+        """The incrementally kept counters must equal a full recount"""
+        incremental = self.counts()
+        rebuild_post_stats([self.user.id])
+        self.assertEqual(incremental, self.counts())
+
+    def make_post(self, **fields):
+        values = {'user': self.user, 'content': 'Launch', 'goal': 'announcement', 'platforms': ['linkedin', 'twitter']}
+        return Post.objects.create(**{**values, **fields})
+
+    def test_create_update_and_delete(self, _redis):
+        post = self.make_post()
+        self.assertEqual(self.counts(), {
+            ('status', 'draft'): 1, ('goal', 'announcement'): 1,
+            ('platform', 'linkedin'): 1, ('platform', 'twitter'): 1,
+        })
+
+        post.status = 'generated'
+        post.goal = 'hiring'
+        post.platforms = ['instagram']
+        post.save()
+        self.assertEqual(self.counts(), {('status', 'generated'): 1, ('goal', 'hiring'): 1, ('platform', 'instagram'): 1})
+        self.assertMatchesRebuild()
+
+        Post.objects.get(id=post.id).delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_saves_without_tracked_fields_change_nothing(self, _redis):
+        post = self.make_post()
+        before = self.counts()
+        post.content = 'Edited'
+        post.save(update_fields=['content', 'updated_at'])
+        post.save()
+        self.assertEqual(self.counts(), before)
+
+    def test_partially_loaded_post(self, _redis):
+        self.make_post(status='generating')
+        post = Post.objects.only('id', 'user', 'status').get(user=self.user)
+        post.status = 'generated'
+        post.save(update_fields=['status', 'updated_at'])
+        self.assertEqual(self.counts()[('status', 'generated')], 1)
+        self.assertNotIn(('status', 'generating'), self.counts())
+        self.assertMatchesRebuild()
+
+    def test_bulk_status_updates_and_inserts(self, _redis):
+        posts = [self.make_post(status='queued') for _ in range(3)]
+        self.assertEqual(update_status(Post.objects.filter(id__in=[post.id for post in posts[:2]]), 'posting'), 2)
+        # Rows already in the target status are not counted twice
+        self.assertEqual(update_status(Post.objects.filter(id=posts[0].id), 'posting'), 0)
+
+        created = Post.objects.bulk_create([
+            Post(user=self.user, content='Bulk', goal='promotion', platforms=['instagram'], status='generating')
+            for _ in range(2)
+        ])
+        record_created_posts(created)
+
+        counts = self.counts()
+        self.assertEqual(counts[('status', 'posting')], 2)
+        self.assertEqual(counts[('status', 'queued')], 1)
+        self.assertEqual(counts[('status', 'generating')], 2)
+        self.assertMatchesRebuild()
+
+    def test_stats_summary(self, _redis):
+        self.make_post(status='posted')
+        upcoming = self.make_post(status='generated', scheduled_at=timezone.now() + timedelta(hours=1))
+        self.make_post(status='generated', scheduled_at=timezone.now() - timedelta(hours=1))
+
+        stats = get_post_stats(self.user)
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['by_status'], {'posted': 1, 'generated': 2})
+        self.assertEqual(stats['by_platform'], {'linkedin': 3, 'twitter': 3})
+        self.assertEqual(stats['upcoming_count'], 1)
+        self.assertEqual([item['id'] for item in stats['upcoming']], [upcoming.id])
@@ -0,0 +1,88 @@
+import logging
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Atomically take up to ARGV[2] members scored <= ARGV[1], with their schedule versions
+_POP_DUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #ids == 0 then
+    return {}
+end
+redis.call('ZREM', KEYS[1], unpack(ids))
+local versions = redis.call('HMGET', KEYS[2], unpack(ids))
+redis.call('HDEL', KEYS[2], unpack(ids))
+local result = {}
+for i, id in ipairs(ids) do
+    result[#result + 1] = id
+    result[#result + 1] = versions[i] or false
+end
+return result
+"""
+
+class DuePostQueue:
+    """
+    Redis sorted set of scheduled posts scored by their scheduled_at timestamp.
+    Adding and popping are O(log n), so dispatch cost doesn't depend on the size of
+    the posts table. The database stays the source of truth; rebuild() resyncs from it.
+    """
+    def __init__(self, client, key='scheduled-posts'):
+        self.redis = client
+        self.key = key
+        self.versions_key = f"{key}:versions"
+        self._pop_due = self.redis.register_script(_POP_DUE_SCRIPT)
+
+    def add(self, post_id, schedule_version, scheduled_at):
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.key, {str(post_id): scheduled_at.timestamp()})
+        pipe.hset(self.versions_key, str(post_id), schedule_version)
+        pipe.execute()
+
+    def remove(self, post_id):
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.key, str(post_id))
+        pipe.hdel(self.versions_key, str(post_id))
+        pipe.execute()
+
+    def pop_due(self, now, limit=100):
+        """Remove and return [(post_id, schedule_version)] due at or before now"""
+        flat = self._pop_due(keys=[self.key, self.versions_key], args=[now.timestamp(), limit])
+        due = []
+        for i in range(0, len(flat), 2):
+            version = flat[i + 1]
+            due.append((int(flat[i]), int(version) if version is not None else None))
+        return due
+
+    def rebuild(self, entries):
+        """Replace the queue with entries of (post_id, schedule_version, scheduled_at)"""
+        tmp_key, tmp_versions_key = f"{self.key}:rebuild", f"{self.versions_key}:rebuild"
+        pipe = self.redis.pipeline()
+        pipe.delete(tmp_key, tmp_versions_key)
+        count = 0
+        for post_id, schedule_version, scheduled_at in entries:
+            pipe.zadd(tmp_key, {str(post_id): scheduled_at.timestamp()})
+            pipe.hset(tmp_versions_key, str(post_id), schedule_version)
+            count += 1
+            if count % 1000 == 0:
+                pipe.execute()
+        pipe.execute()
+
+        # Swap both keys in one transaction so dispatchers never see a half-built queue
+        swap = self.redis.pipeline(transaction=True)
+        if count:
+            swap.rename(tmp_key, self.key)
+            swap.rename(tmp_versions_key, self.versions_key)
+        else:
+            swap.delete(self.key, self.versions_key)
+        swap.execute()
+        return count
+
+    def __len__(self):
+        return self.redis.zcard(self.key)
+
+def get_due_post_queue():
+    return DuePostQueue(redis.Redis.from_url(settings.CELERY_BROKER_URL))
+
+def use_timing_wheel():
+    return getattr(settings, 'POST_SCHEDULER_BACKEND', 'eta') == 'redis'
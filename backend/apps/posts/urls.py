@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet
+from .views import PostViewSet, post_events
 
 router = DefaultRouter()
 router.register(r'', PostViewSet, basename='post')
 
 urlpatterns = [
+    # Before the router, whose detail route would otherwise read 'events' as a post id
+    path('events/', post_events, name='post-events'),
     path('', include(router.urls)),
 ]
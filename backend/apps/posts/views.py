@@ -1,18 +1,237 @@
-from rest_framework import viewsets, permissions
+import json
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from celery import group
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.exceptions import ParseError, AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Substr
+from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from common.authentication import QueryParamJWTAuthentication
+from common.renderers import EventStreamRenderer
+from common.pagination import CreatedAtCursorPagination
+from apps.ai_engine.streaming import aiter_caption_events, iter_caption_events
 from .models import Post
-from .serializers import PostSerializer
-from .tasks import generate_post_text_task
+from .serializers import PostSerializer, PostListSerializer
+from .parsers import NDJSONParser, parse_ndjson_lines
+from .tasks import generate_post_text_task, build_post_derivatives
+from .scheduling import schedule_publish
+from .stats import get_post_stats, record_created_posts
+from .events import aiter_post_events, iter_post_events
+
+# Columns the list endpoint never loads
+LIST_DEFERRED_FIELDS = (
+    'content', 'base_caption',
+    'instagram_caption', 'instagram_hashtags',
+    'linkedin_caption', 'linkedin_hashtags',
+    'twitter_caption', 'twitter_hashtags',
+    'generated_outputs', 'image_derivatives',
+)
 
 class PostViewSet(viewsets.ModelViewSet):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return Post.objects.filter(user=self.request.user)
+        posts = Post.objects.filter(user=self.request.user)
+        if self.action != 'list':
+            return posts
+
+        requested = PostListSerializer.requested_fields(self.request)
+        if requested:
+            # Load only the requested columns (plus what the cursor orders by)
+            columns = {field.name for field in Post._meta.concrete_fields} - set(LIST_DEFERRED_FIELDS)
+            posts = posts.only(*((requested & columns) | {'id', 'created_at'}))
+        else:
+            posts = posts.defer(*LIST_DEFERRED_FIELDS)
+        if not requested or 'excerpt' in requested:
+            excerpt_length = getattr(settings, 'POSTS_LIST_EXCERPT_LENGTH', 140)
+            posts = posts.annotate(excerpt=Substr('content', 1, excerpt_length))
+        return posts
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PostListSerializer
+        return PostSerializer
 
     def perform_create(self, serializer):
-        post = serializer.save()
+        # Insert directly in the 'generating' state instead of saving twice
+        post = serializer.save(status='generating')
         # Trigger background task
-        post.status = 'generating'
-        post.save()
         generate_post_text_task.delay(post.id)
+        if post.media_items():
+            build_post_derivatives.delay(post.id)
+
+    def perform_update(self, serializer):
+        previous_scheduled_at = serializer.instance.scheduled_at
+        images_changed = 'image' in serializer.validated_data or 'media_files' in serializer.validated_data
+        post = serializer.save()
+        if images_changed and post.media_items():
+            build_post_derivatives.delay(post.id)
+        if post.scheduled_at != previous_scheduled_at:
+            # Re-enqueue at the new time; the version bump turns the old ETA into a no-op
+            schedule_publish(post)
+
+    def _read_bulk_items(self, request):
+        """Accept a JSON list, an NDJSON body, or a multipart upload holding either"""
+        if 'file' in request.FILES:
+            upload = request.FILES['file']
+            head = upload.read(1024).lstrip()
+            upload.seek(0)
+            if head.startswith(b'['):
+                try:
+                    return json.load(upload)
+                except ValueError as e:
+                    raise ParseError(f"Invalid JSON file: {str(e)}")
+            return parse_ndjson_lines(upload)
+        return request.data
+
+    @staticmethod
+    def _bulk_create_without_returning(posts):
+        """
+        bulk_create for backends like MySQL that don't return ids from bulk inserts.
+        Rows are tagged with a per-request token, read back in one query (ids rise in
+        insertion order) and untagged again, so the inserts stay batched.
+        """
+        token = uuid.uuid4().hex
+        started = timezone.now()
+        for post in posts:
+            post.generated_outputs = {'bulk_token': token}
+        Post.objects.bulk_create(posts, batch_size=500)
+        ids = list(
+            Post.objects.filter(user=posts[0].user, created_at__gte=started, generated_outputs__bulk_token=token)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        if len(ids) != len(posts):
+            raise Exception(f"Bulk insert returned {len(ids)} rows for {len(posts)} posts")
+        Post.objects.filter(id__in=ids).update(generated_outputs={})
+        for post, post_id in zip(posts, ids):
+            post.id = post_id
+            post.generated_outputs = {}
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser, MultiPartParser])
+    def bulk(self, request):
+        """Create many posts in one request and fan their generation out to Celery"""
+        items = self._read_bulk_items(request)
+        if not isinstance(items, list):
+            raise ParseError("Expected a list of posts.")
+        max_items = getattr(settings, 'POSTS_BULK_MAX_ITEMS', 1000)
+        if len(items) > max_items:
+            raise ParseError(f"Too many posts in one request ({len(items)} > {max_items}).")
+
+        posts, indexes, errors = [], [], []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                # Rows in a bulk upload carry no files, so only the single image field applies
+                serializer.validated_data.pop('media_files', None)
+                posts.append(Post(user=request.user, status='generating', **serializer.validated_data))
+                indexes.append(index)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                posts = Post.objects.bulk_create(posts, batch_size=500)
+            elif posts:
+                self._bulk_create_without_returning(posts)
+            # bulk_create skips save signals, so count the new posts here
+            record_created_posts(posts)
+
+        post_ids = [post.id for post in posts]
+        chunk_size = getattr(settings, 'POSTS_BULK_CHUNK_SIZE', 50)
+        for start in range(0, len(post_ids), chunk_size):
+            # One group per chunk publishes its messages over a single broker connection
+            group(generate_post_text_task.s(post_id) for post_id in post_ids[start:start + chunk_size]).apply_async()
+
+        created = [{'index': index, 'id': post_id} for index, post_id in zip(indexes, post_ids)]
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Dashboard counts by status, platform and goal plus upcoming scheduled posts"""
+        return Response(get_post_stats(request.user))
+
+    @action(detail=True, methods=['post'])
+    def regenerate(self, request, pk=None):
+        """Generate fresh captions, skipping cached LLM responses"""
+        post = self.get_object()
+        if post.status in Post.PUBLISH_LOCKED_STATUSES:
+            return Response(
+                {'error': f"A post that is {post.status} can't be regenerated."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        post.status = 'generating'
+        post.save(update_fields=['status', 'updated_at'])
+        generate_post_text_task.delay(post.id, regenerate=True)
+        return Response(self.get_serializer(post).data)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+        authentication_classes=[JWTAuthentication, QueryParamJWTAuthentication],
+    )
+    def stream(self, request, pk=None):
+        """Server-Sent Events feed of captions as they are generated"""
+        post = self.get_object()
+        # Under ASGI a sync generator would be buffered until it finishes
+        if isinstance(request._request, ASGIRequest):
+            events = aiter_caption_events(post)
+        else:
+            events = iter_caption_events(post)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+async def post_events(request):
+    """
+    Server-Sent Events feed of the user's post changes (created, status updates, deleted).
+    A plain async view rather than a DRF action so that under ASGI an idle connection
+    holds no thread. Authenticates with a JWT from the Authorization header or ?token=.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = request.GET.get('token') or (authenticator.get_raw_token(header) if header else None)
+    try:
+        if not raw_token:
+            raise AuthenticationFailed('Authentication credentials were not provided.')
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        validated_token = authenticator.get_validated_token(raw_token)
+        user = await sync_to_async(authenticator.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed) as e:
+        detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+        return HttpResponse(EventStreamRenderer().render(detail), status=401, content_type='text/event-stream')
+
+    # Close when the token expires so the client reconnects with a fresh one
+    lifetime = min(
+        getattr(settings, 'POST_EVENTS_MAX_DURATION', 3600),
+        validated_token['exp'] - time.time()
+    )
+    deadline = time.monotonic() + lifetime
+    if isinstance(request, ASGIRequest):
+        events = aiter_post_events(user.id, deadline)
+    else:
+        events = iter_post_events(user.id, deadline)
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,13 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+class QueryParamJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication reading the token from ?token=.
+    Only meant for EventSource endpoints, since browsers can't set headers on them.
+    """
+    def authenticate(self, request):
+        raw_token = request.query_params.get('token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
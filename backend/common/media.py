@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import mimetypes
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import http_date
+from django.views.decorators.http import require_http_methods
+
+# Derivatives live under their content hash, so their bytes never change
+HASHED_NAME_RE = re.compile(r'^derivatives/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})/(?P<file>[\w.-]+)$')
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+def _signature(name, expires):
+    return salted_hmac('common.media', f"{name}:{expires}", algorithm='sha256').hexdigest()
+
+def media_url(name):
+    """
+    Absolute URL Meta's fetcher can use for a stored file. With MEDIA_SIGNED_URLS
+    the URL carries an expiring signature and MEDIA_ROOT needn't be public.
+    """
+    url = default_storage.url(name)
+    if not url.startswith('http'):
+        url = settings.SITE_URL.rstrip('/') + '/' + url.lstrip('/')
+    if getattr(settings, 'MEDIA_SIGNED_URLS', False):
+        expires = int(time.time()) + getattr(settings, 'MEDIA_URL_TTL', 86400)
+        url += '?' + urlencode({'expires': expires, 'signature': _signature(name, expires)})
+    return url
+
+def _check_signature(request, name):
+    try:
+        expires = int(request.GET.get('expires', ''))
+    except ValueError:
+        return False
+    signature = request.GET.get('signature', '')
+    return expires >= time.time() and constant_time_compare(signature, _signature(name, expires))
+
+def _file_etag(name, stat):
+    match = HASHED_NAME_RE.match(name)
+    if match:
+        return f'"{match.group("digest")}-{match.group("file")}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def _parse_range(header, size):
+    """(start, end) for a single satisfiable byte range, None to serve the whole file, or False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match or not (match.group('start') or match.group('end')):
+        # Multi-range and malformed headers are ignored, as RFC 9110 allows
+        return None
+    start, end = match.group('start'), match.group('end')
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(end), 0)
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """
+    Serve MEDIA_ROOT files with validators, Range support and, when a front-end
+    proxy is configured, X-Accel-Redirect/X-Sendfile so the bytes never pass
+    through a WSGI worker.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404("Invalid media path")
+    name = path.replace(os.sep, '/')
+
+    if getattr(settings, 'MEDIA_SIGNED_URLS', False) and not _check_signature(request, name):
+        return HttpResponseForbidden("Invalid or expired media signature")
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    etag = _file_etag(name, stat)
+    if HASHED_NAME_RE.match(name):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+    headers = {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    backend = getattr(settings, 'MEDIA_SERVE_BACKEND', 'django')
+    if backend in ('nginx', 'apache'):
+        # The proxy does the sendfile() and Range handling itself
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name
+        else:
+            response['X-Sendfile'] = full_path
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stat.st_size}"
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        body = _iter_range(full_path, start, length) if request.method == 'GET' else []
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+        response['Content-Length'] = str(length)
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = str(stat.st_size)
+    else:
+        # FileResponse hands the file to wsgi.file_wrapper, which uses sendfile() where the server supports it
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
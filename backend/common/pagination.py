@@ -0,0 +1,12 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination on (created_at, id). Each page is one index range
+    scan from the cursor, so deep pages cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'API_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
@@ -0,0 +1,17 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF content negotiation accept 'text/event-stream' requests.
+    SSE views return a StreamingHttpResponse themselves; this only renders
+    error responses (auth, not found) as a single 'error' event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode(self.charset)
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+import time
+from urllib.parse import urlsplit, parse_qsl
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from common.media import media_url, serve_media, _signature
+
+CONTENT = bytes(range(256)) * 4
+
+class ServeMediaTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        with open(f"{self.media_root}/photo.jpg", 'wb') as f:
+            f.write(CONTENT)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_SERVE_BACKEND='django',
+            MEDIA_SIGNED_URLS=False, SITE_URL='https://app.example.com'
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.factory = RequestFactory()
+
+    def get(self, path='photo.jpg', query=None, **headers):
+        return serve_media(self.factory.get(f"/media/{path}", query or {}, headers=headers), path)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        for header, start, end in (('bytes=10-19', 10, 19), ('bytes=1000-', 1000, 1023), ('bytes=-24', 1000, 1023), ('bytes=1020-5000', 1020, 1023)):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], f"bytes {start}-{end}/{len(CONTENT)}")
+            self.assertEqual(response['Content-Length'], str(end - start + 1))
+            self.assertEqual(self.body(response), CONTENT[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f"bytes */{len(CONTENT)}")
+
+    def test_malformed_and_multi_ranges_serve_the_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-'):
+            self.assertEqual(self.get(Range=header).status_code, 200, header)
+
+    def test_if_range_with_stale_etag_serves_the_whole_file(self):
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"').status_code, 200)
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+
+    def test_conditional_request(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+
+    def test_path_outside_media_root(self):
+        from django.http import Http404
+        with self.assertRaises(Http404):
+            self.get('../secret.txt')
+
+    @override_settings(MEDIA_SIGNED_URLS=True, MEDIA_URL_TTL=60)
+    def test_signed_urls(self):
+        query = dict(parse_qsl(urlsplit(media_url('photo.jpg')).query))
+        self.assertEqual(self.get(query=query).status_code, 200)
+        self.assertEqual(self.get(Range='bytes=0-9', query=query).status_code, 206)
+
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(query={**query, 'signature': '0' * 64}).status_code, 403)
+        # A signature is only valid for the file it was made for
+        with open(f"{self.media_root}/other.jpg", 'wb') as f:
+            f.write(CONTENT)
+        self.assertEqual(self.get('other.jpg', query=query).status_code, 403)
+
+    @override_settings(MEDIA_SIGNED_URLS=True)
+    def test_expired_signature(self):
+        expires = int(time.time()) - 1
+        query = {'expires': expires, 'signature': _signature('photo.jpg', expires)}
+        self.assertEqual(self.get(query=query).status_code, 403)
@@ -1,4 +1,5 @@
 import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media.settings')
+# Async views (the post event stream) hold no thread per connection when served from here
 application = get_asgi_application()
@@ -17,6 +17,12 @@ environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
 
 SECRET_KEY = env('SECRET_KEY', default='django-insecure-change-me')
 ENCRYPTION_KEY = env('ENCRYPTION_KEY', default=base64.urlsafe_b64encode(b'dev-fallback-key-32-bytes-long!!!').decode())
+# Comma-separated Fernet keys, newest first, for rotation: new tokens use the first key,
+# every key can still decrypt. Run `manage.py reencrypt_tokens` before dropping an old key.
+ENCRYPTION_KEYS = env.list('ENCRYPTION_KEYS', default=[])
+# Decrypted access tokens are cached per process for this many seconds (0 disables)
+TOKEN_CACHE_TTL = env.int('TOKEN_CACHE_TTL', default=300)
+TOKEN_CACHE_MAX_ENTRIES = env.int('TOKEN_CACHE_MAX_ENTRIES', default=1024)
 DEBUG = env('DEBUG', default=True)
 
 ALLOWED_HOSTS = ['*']
@@ -73,6 +79,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'social_media.wsgi.application'
+ASGI_APPLICATION = 'social_media.asgi.application'
 
 # Database
 DATABASES = {
@@ -108,6 +115,15 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 'django' streams files itself; 'nginx' (X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an
+# internal location aliased to MEDIA_ROOT) or 'apache' (X-Sendfile) hand the transfer to the proxy
+MEDIA_SERVE_BACKEND = env('MEDIA_SERVE_BACKEND', default='django')
+MEDIA_ACCEL_PREFIX = env('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = env.int('MEDIA_CACHE_MAX_AGE', default=3600)
+# Signed, expiring media URLs so MEDIA_ROOT doesn't have to be public
+MEDIA_SIGNED_URLS = env.bool('MEDIA_SIGNED_URLS', default=False)
+MEDIA_URL_TTL = env.int('MEDIA_URL_TTL', default=86400)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework Settings
@@ -119,6 +135,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
+API_PAGE_SIZE = env.int('API_PAGE_SIZE', default=20)
+API_MAX_PAGE_SIZE = env.int('API_MAX_PAGE_SIZE', default=100)
+POSTS_LIST_EXCERPT_LENGTH = env.int('POSTS_LIST_EXCERPT_LENGTH', default=140)
+# Dashboard stats: cached counter summary TTL (seconds) and upcoming posts shown
+POST_STATS_CACHE_TTL = env.int('POST_STATS_CACHE_TTL', default=300)
+POST_STATS_UPCOMING_LIMIT = env.int('POST_STATS_UPCOMING_LIMIT', default=5)
+# Per-user post event stream at /api/posts/events/ (serve via ASGI for many idle connections)
+POST_EVENTS_KEEPALIVE = env.int('POST_EVENTS_KEEPALIVE', default=15)
+POST_EVENTS_MAX_DURATION = env.int('POST_EVENTS_MAX_DURATION', default=3600)
+POST_EVENTS_QUEUE_SIZE = env.int('POST_EVENTS_QUEUE_SIZE', default=100)
 
 # Simple JWT Settings
 SIMPLE_JWT = {
@@ -137,15 +163,72 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# The Redis broker redelivers an unacknowledged message (ETA tasks included) after
+# visibility_timeout, so it must stay well above SCHEDULED_POST_ETA_WINDOW
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': env.int('CELERY_VISIBILITY_TIMEOUT', default=7200),
+}
+
+# AI Generation Settings
+# Maximum number of platform rewrites sent to Ollama at the same time for one post
+AI_PLATFORM_MAX_WORKERS = env.int('AI_PLATFORM_MAX_WORKERS', default=3)
+# 'per_platform' sends 1 + N prompts per post, 'combined' asks for everything in one JSON response
+AI_GENERATION_MODE = env('AI_GENERATION_MODE', default='per_platform')
+
+# LLM response cache (in-process LRU, optionally backed by the Redis broker)
+LLM_CACHE_ENABLED = env.bool('LLM_CACHE_ENABLED', default=True)
+LLM_CACHE_MAX_ENTRIES = env.int('LLM_CACHE_MAX_ENTRIES', default=512)
+LLM_CACHE_TTL = env.int('LLM_CACHE_TTL', default=86400)
+LLM_CACHE_REDIS = env.bool('LLM_CACHE_REDIS', default=False)
+
+# Stream partial captions from the worker over Redis pub/sub to /api/posts/{id}/stream/
+AI_STREAMING_ENABLED = env.bool('AI_STREAMING_ENABLED', default=True)
+AI_STREAM_TIMEOUT = env.int('AI_STREAM_TIMEOUT', default=600)
+AI_STREAM_KEEPALIVE = env.int('AI_STREAM_KEEPALIVE', default=15)
 
 # Celery Beat Schedule
 from celery.schedules import crontab
+# Scheduled posts are published by exact-time ETA tasks; this is only a safety net
 CELERY_BEAT_SCHEDULE = {
-    'check-scheduled-posts-every-minute': {
+    'reconcile-scheduled-posts': {
         'task': 'apps.posts.tasks.check_and_publish_scheduled_posts',
-        'schedule': crontab(minute='*'),
+        'schedule': crontab(minute='*/5'),
+    },
+    'refresh-expiring-tokens': {
+        'task': 'apps.platforms.tasks.refresh_expiring_tokens',
+        'schedule': crontab(minute=0, hour='*/6'),
     },
 }
+SCHEDULED_POST_GRACE_SECONDS = env.int('SCHEDULED_POST_GRACE_SECONDS', default=60)
+SCHEDULED_POST_BATCH_SIZE = env.int('SCHEDULED_POST_BATCH_SIZE', default=100)
+# Only posts due within this many seconds get an ETA task; later ones are enqueued
+# by enqueue_upcoming_scheduled_posts every SCHEDULED_POST_HANDOFF_INTERVAL seconds
+SCHEDULED_POST_ETA_WINDOW = env.int('SCHEDULED_POST_ETA_WINDOW', default=1800)
+SCHEDULED_POST_HANDOFF_INTERVAL = env.int('SCHEDULED_POST_HANDOFF_INTERVAL', default=600)
+
+# 'eta' enqueues a Celery ETA task per scheduled post; 'redis' keeps a sorted-set due queue
+# in the broker that a lightweight dispatcher drains every few seconds
+POST_SCHEDULER_BACKEND = env('POST_SCHEDULER_BACKEND', default='eta')
+if POST_SCHEDULER_BACKEND == 'redis':
+    CELERY_BEAT_SCHEDULE.update({
+        'dispatch-due-posts': {
+            'task': 'apps.posts.tasks.dispatch_due_posts',
+            'schedule': timedelta(seconds=env.int('POST_DISPATCH_INTERVAL', default=5)),
+        },
+        'rebuild-due-post-queue': {
+            'task': 'apps.posts.tasks.rebuild_due_post_queue',
+            'schedule': crontab(minute='*/10'),
+        },
+    })
+else:
+    CELERY_BEAT_SCHEDULE['enqueue-upcoming-scheduled-posts'] = {
+        'task': 'apps.posts.tasks.enqueue_upcoming_scheduled_posts',
+        'schedule': timedelta(seconds=SCHEDULED_POST_HANDOFF_INTERVAL),
+    }
+
+# Bulk post import (/api/posts/bulk/)
+POSTS_BULK_MAX_ITEMS = env.int('POSTS_BULK_MAX_ITEMS', default=1000)
+POSTS_BULK_CHUNK_SIZE = env.int('POSTS_BULK_CHUNK_SIZE', default=50)
 
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True
@@ -159,6 +242,46 @@ META_APP_SECRET = env('META_APP_SECRET', default='')
 META_REDIRECT_URI = env('META_REDIRECT_URI', default='http://localhost:8000/api/platforms/instagram/callback/')
 META_GRAPH_BASE = env('META_GRAPH_BASE', default='https://graph.facebook.com/v19.0')
 
+# LinkedIn and X publishing (point these at stand-in servers for local testing)
+LINKEDIN_API_BASE = env('LINKEDIN_API_BASE', default='https://api.linkedin.com')
+LINKEDIN_API_VERSION = env('LINKEDIN_API_VERSION', default='202401')
+TWITTER_API_BASE = env('TWITTER_API_BASE', default='https://api.twitter.com')
+
+# Proactive refresh of long-lived Meta tokens expiring within the window
+TOKEN_REFRESH_WINDOW_DAYS = env.int('TOKEN_REFRESH_WINDOW_DAYS', default=7)
+TOKEN_REFRESH_BATCH_SIZE = env.int('TOKEN_REFRESH_BATCH_SIZE', default=100)
+TOKEN_REFRESH_CONCURRENCY = env.int('TOKEN_REFRESH_CONCURRENCY', default=4)
+
+# Graph API HTTP client
+GRAPH_CONNECT_TIMEOUT = env.int('GRAPH_CONNECT_TIMEOUT', default=5)
+GRAPH_READ_TIMEOUT = env.int('GRAPH_READ_TIMEOUT', default=30)
+GRAPH_MAX_RETRIES = env.int('GRAPH_MAX_RETRIES', default=3)
+GRAPH_POOL_SIZE = env.int('GRAPH_POOL_SIZE', default=20)
+# Start slowing down above the soft limit (percent of Meta's budget), stop at the hard limit
+GRAPH_USAGE_SOFT_LIMIT = env.int('GRAPH_USAGE_SOFT_LIMIT', default=75)
+GRAPH_USAGE_HARD_LIMIT = env.int('GRAPH_USAGE_HARD_LIMIT', default=95)
+
+# Instagram publishing rate limits (token buckets in Redis)
+INSTAGRAM_PUBLISH_LIMIT = env.int('INSTAGRAM_PUBLISH_LIMIT', default=50)
+INSTAGRAM_PUBLISH_LIMIT_PERIOD = env.int('INSTAGRAM_PUBLISH_LIMIT_PERIOD', default=86400)
+INSTAGRAM_APP_PUBLISH_LIMIT = env.int('INSTAGRAM_APP_PUBLISH_LIMIT', default=200)
+INSTAGRAM_APP_PUBLISH_LIMIT_PERIOD = env.int('INSTAGRAM_APP_PUBLISH_LIMIT_PERIOD', default=3600)
+# Resync the per-user bucket from Graph API content_publishing_limit at most every interval
+INSTAGRAM_SYNC_PUBLISHING_LIMIT = env.bool('INSTAGRAM_SYNC_PUBLISHING_LIMIT', default=False)
+INSTAGRAM_QUOTA_SYNC_INTERVAL = env.int('INSTAGRAM_QUOTA_SYNC_INTERVAL', default=300)
+
+# Media container readiness polling (seconds); delays double per check up to the max
+INSTAGRAM_CONTAINER_POLL_INITIAL = env.int('INSTAGRAM_CONTAINER_POLL_INITIAL', default=2)
+INSTAGRAM_CONTAINER_POLL_MAX_DELAY = env.int('INSTAGRAM_CONTAINER_POLL_MAX_DELAY', default=60)
+INSTAGRAM_CONTAINER_POLL_MAX_ATTEMPTS = env.int('INSTAGRAM_CONTAINER_POLL_MAX_ATTEMPTS', default=12)
+
+# Carousel posts: Instagram allows up to 10 items; child containers are created in parallel
+INSTAGRAM_CAROUSEL_MAX_ITEMS = env.int('INSTAGRAM_CAROUSEL_MAX_ITEMS', default=10)
+INSTAGRAM_CAROUSEL_MAX_WORKERS = env.int('INSTAGRAM_CAROUSEL_MAX_WORKERS', default=10)
+
+# Threads used to resize/re-encode uploads into per-platform derivatives
+IMAGE_DERIVATIVE_WORKERS = env.int('IMAGE_DERIVATIVE_WORKERS', default=2)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -1,7 +1,7 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from common.media import serve_media
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -20,7 +20,7 @@ urlpatterns = [
     
     # Platforms Endpoints
     path('api/platforms/', include('apps.platforms.urls')),
-]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media (fetched by Meta when publishing); offloaded to the proxy via MEDIA_SERVE_BACKEND
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', serve_media, name='media'),
+]
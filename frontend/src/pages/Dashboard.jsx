@@ -1,16 +1,23 @@
 import React, { useState, useEffect } from 'react';
 import api from '../services/api';
+import { subscribePostEvents } from '../services/events';
 import { NavLink } from 'react-router-dom';
 
 const Dashboard = () => {
     const [posts, setPosts] = useState([]);
+    const [stats, setStats] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const fetchPosts = async () => {
             try {
-                const response = await api.get('/posts/');
-                setPosts(response.data);
+                // Counts come from the server-side summary; only the 5 most recent rows are listed
+                const [statsResponse, response] = await Promise.all([
+                    api.get('/posts/stats/'),
+                    api.get('/posts/', { params: { fields: 'id,excerpt,status,created_at', page_size: 5 } }),
+                ]);
+                setStats(statsResponse.data);
+                setPosts(response.data.results);
             } catch (error) {
                 console.error("Failed to fetch posts", error);
             } finally {
@@ -18,8 +25,30 @@ const Dashboard = () => {
             }
         };
         fetchPosts();
+
+        // Refresh the (cached, cheap) counts at most once a second while events arrive
+        let statsTimer = null;
+        const unsubscribe = subscribePostEvents((type, data) => {
+            if (type === 'updated') {
+                setPosts((current) => current.map((post) => (post.id === data.post_id ? { ...post, status: data.status } : post)));
+            }
+            if (!statsTimer) {
+                statsTimer = setTimeout(() => {
+                    statsTimer = null;
+                    fetchPosts();
+                }, 1000);
+            }
+        });
+        return () => {
+            clearTimeout(statsTimer);
+            unsubscribe();
+        };
     }, []);
 
+    const byStatus = stats?.by_status || {};
+    const finished = (byStatus.posted || 0) + (byStatus.partial || 0) + (byStatus.failed || 0);
+    const successRate = finished ? Math.round(((byStatus.posted || 0) / finished) * 100) : 100;
+
     return (
         <div className="max-w-6xl mx-auto p-8 space-y-8">
             {/* Page Heading */}
@@ -44,7 +73,7 @@ const Dashboard = () => {
                         <p className="text-white/80 text-sm font-medium">Total Posts</p>
                         <span className="material-symbols-outlined opacity-60">analytics</span>
                     </div>
-                    <p className="text-3xl font-bold tracking-tight">{posts.length}</p>
+                    <p className="text-3xl font-bold tracking-tight">{stats?.total ?? 0}</p>
                     <div className="flex items-center gap-1 mt-2">
                         <span className="material-symbols-outlined text-xs">trending_up</span>
                         <p className="text-xs font-semibold">+12% from last month</p>
@@ -57,7 +86,7 @@ const Dashboard = () => {
                         <p className="text-slate-500 dark:text-slate-400 text-sm font-medium">Scheduled</p>
                         <span className="material-symbols-outlined text-primary">schedule</span>
                     </div>
-                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">0</p>
+                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">{stats?.upcoming_count ?? 0}</p>
                     <div className="flex items-center gap-1 mt-2">
                         <span className="material-symbols-outlined text-xs text-emerald-500">trending_up</span>
                         <p className="text-xs font-semibold text-emerald-500">+5% increasing</p>
@@ -70,7 +99,7 @@ const Dashboard = () => {
                         <p className="text-slate-500 dark:text-slate-400 text-sm font-medium">Success Rate</p>
                         <span className="material-symbols-outlined text-emerald-500">check_circle</span>
                     </div>
-                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">100%</p>
+                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">{successRate}%</p>
                     <div className="flex items-center gap-1 mt-2">
                         <span className="material-symbols-outlined text-xs text-emerald-500">arrow_upward</span>
                         <p className="text-xs font-semibold text-emerald-500">Stable</p>
@@ -83,7 +112,7 @@ const Dashboard = () => {
                         <p className="text-slate-500 dark:text-slate-400 text-sm font-medium">Failed</p>
                         <span className="material-symbols-outlined text-rose-500">error</span>
                     </div>
-                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">0</p>
+                    <p className="text-3xl font-bold tracking-tight text-slate-900 dark:text-white">{byStatus.failed || 0}</p>
                     <div className="flex items-center gap-1 mt-2 text-rose-500">
                         <span className="material-symbols-outlined text-xs">trending_down</span>
                         <p className="text-xs font-semibold">-2% improvement</p>
@@ -110,7 +139,7 @@ const Dashboard = () => {
                                             <span className="material-symbols-outlined">image</span>
                                         </div>
                                         <div className="flex flex-col">
-                                            <p className="text-sm font-semibold text-slate-900 dark:text-white line-clamp-1">{post.content || 'Untitled Post'}</p>
+                                            <p className="text-sm font-semibold text-slate-900 dark:text-white line-clamp-1">{post.excerpt || 'Untitled Post'}</p>
                                             <div className="flex items-center gap-2 mt-1">
                                                 <span className="text-xs font-bold text-pink-600 flex items-center gap-1">
                                                     <span className="material-symbols-outlined text-[10px]">photo_camera</span> {post.platform || 'INSTAGRAM'}
@@ -1,22 +1,40 @@
 import React, { useState, useEffect } from 'react';
 import api from '../services/api';
+import { subscribePostEvents } from '../services/events';
+
+const LIST_FIELDS = 'id,excerpt,image,status,created_at';
 
 const Posts = () => {
     const [posts, setPosts] = useState([]);
+    const [next, setNext] = useState(null);
     const [loading, setLoading] = useState(true);
 
+    // Pages are cursor-based: `next` is the URL of the following page, or null at the end
+    const fetchPosts = async (url = '/posts/') => {
+        setLoading(true);
+        try {
+            const response = await api.get(url, url === '/posts/' ? { params: { fields: LIST_FIELDS } } : undefined);
+            setPosts((current) => (url === '/posts/' ? response.data.results : [...current, ...response.data.results]));
+            setNext(response.data.next);
+        } catch (error) {
+            console.error("Failed to fetch posts", error);
+        } finally {
+            setLoading(false);
+        }
+    };
+
     useEffect(() => {
-        const fetchPosts = async () => {
-            try {
-                const response = await api.get('/posts/');
-                setPosts(response.data);
-            } catch (error) {
-                console.error("Failed to fetch posts", error);
-            } finally {
-                setLoading(false);
-            }
-        };
         fetchPosts();
+        // Status changes are pushed by the server, so rows are patched in place instead of refetching
+        return subscribePostEvents((type, data) => {
+            if (type === 'updated') {
+                setPosts((current) => current.map((post) => (post.id === data.post_id ? { ...post, status: data.status } : post)));
+            } else if (type === 'deleted') {
+                setPosts((current) => current.filter((post) => post.id !== data.post_id));
+            } else {
+                fetchPosts();
+            }
+        });
     }, []);
 
     return (
@@ -89,15 +107,15 @@ const Posts = () => {
                                             <tr key={post.id} className="hover:bg-slate-50 dark:hover:bg-slate-800/40 transition-colors group">
                                                 <td className="px-6 py-4">
                                                     <div className="w-12 h-12 rounded-lg bg-gray-200 border border-slate-200 dark:border-slate-700 flex items-center justify-center text-slate-400 overflow-hidden">
-                                                        {post.media_url ? (
-                                                            <img src={post.media_url} className="w-full h-full object-cover" alt="Post thumbnail" />
+                                                        {post.image ? (
+                                                            <img src={post.image} className="w-full h-full object-cover" alt="Post thumbnail" />
                                                         ) : (
                                                             <span className="material-symbols-outlined">image</span>
                                                         )}
                                                     </div>
                                                 </td>
                                                 <td className="px-6 py-4 max-w-xs">
-                                                    <p className="text-sm font-medium text-slate-900 dark:text-slate-100 truncate">{post.content || 'Untitled Post'}</p>
+                                                    <p className="text-sm font-medium text-slate-900 dark:text-slate-100 truncate">{post.excerpt || 'Untitled Post'}</p>
                                                 </td>
                                                 <td className="px-6 py-4 text-center">
                                                     <span className="material-symbols-outlined text-pink-600">photo_camera</span>
@@ -124,6 +142,13 @@ const Posts = () => {
                                 </table>
                             )}
                         </div>
+                        {next && (
+                            <div className="p-4 border-t border-slate-100 dark:border-slate-800 text-center">
+                                <button onClick={() => fetchPosts(next)} disabled={loading} className="px-4 py-2 bg-white dark:bg-slate-800 border border-slate-200 dark:border-slate-700 rounded-lg text-sm font-bold text-slate-700 dark:text-slate-200 disabled:opacity-50">
+                                    {loading ? 'Loading...' : 'Load more'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
             </section>
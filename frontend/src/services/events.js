@@ -0,0 +1,51 @@
+import api from './api';
+import { getToken } from './auth';
+
+const EVENT_TYPES = ['created', 'updated', 'deleted', 'resync'];
+const MAX_RETRY_DELAY = 30000;
+
+// Subscribes to the user's post events; onEvent(type, data) is called for each one.
+// Returns a function that closes the stream.
+export const subscribePostEvents = (onEvent) => {
+    let source = null;
+    let retryTimer = null;
+    let retryDelay = 1000;
+    let closed = false;
+
+    const connect = () => {
+        const token = getToken();
+        if (!token || closed) {
+            return;
+        }
+        // EventSource can't send headers, and the token may have been refreshed since the last attempt
+        source = new EventSource(`${api.defaults.baseURL}/posts/events/?token=${encodeURIComponent(token)}`);
+        source.addEventListener('ready', () => {
+            retryDelay = 1000;
+        });
+        EVENT_TYPES.forEach((type) => {
+            source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+        });
+        source.onerror = () => {
+            // The server ends the stream when the token expires; reconnect ourselves with a fresh one
+            source.close();
+            if (closed) {
+                return;
+            }
+            retryTimer = setTimeout(() => {
+                // Events sent while disconnected are lost, so let the page refetch
+                onEvent('resync', {});
+                connect();
+            }, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+        };
+    };
+
+    connect();
+    return () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        if (source) {
+            source.close();
+        }
+    };
+};